@@ -0,0 +1,183 @@
+# api.py
+
+import json
+import threading
+import time
+from collections import deque
+import metrics
+from registry import CAMERA_REMOVED
+
+try:
+    from flask import Flask, Response, request
+    from werkzeug.serving import WSGIRequestHandler, make_server
+except ImportError:  # Flask is optional; only needed for the HTTP API
+    Flask = None
+    WSGIRequestHandler = object
+
+STREAM_HEARTBEAT = 15  # Seconds between keep-alive comments on idle event streams
+CHANGE_LOG_SIZE = 10000  # Changes remembered for streaming clients that fall behind
+
+class OccupancyCache:
+    """Latest per-camera and total occupancy, kept in memory for API clients.
+
+    The cache is updated from polling engine snapshots, so serving clients never
+    touches the cameras. Every change bumps 'version', which together with the
+    start time (so a restarted process never reuses an old tag) makes the ETag.
+    """
+
+    def __init__(self, registry, engine):
+        self.registry = registry
+        self.engine = engine
+        self.cameras = {}  # camera_id -> JSON-ready dict
+        self.total = 0
+        self.version = 0
+        self.started = int(time.time())  # Keeps ETags from different runs apart
+        self.changes = deque(maxlen=CHANGE_LOG_SIZE)  # (version, camera_id)
+        self.body = None
+        self.body_version = None
+        self.condition = threading.Condition()
+
+        self.engine.subscribe(self.update)
+        self.registry.subscribe(self.on_registry_event)
+
+    def close(self):
+        """Stop following the polling engine and registry."""
+        self.engine.unsubscribe(self.update)
+        self.registry.unsubscribe(self.on_registry_event)
+
+    def update(self, snapshot):
+        """Store a snapshot if anything a client can see has changed."""
+        camera = snapshot.camera
+        entry = {
+            "id": camera.camera_id,
+            "number": self.registry.number(camera.camera_id),
+            "ip": camera.ip,
+            "entered": snapshot.entered,
+            "exited": snapshot.exited,
+            "currently_in": snapshot.currently_in,
+            "health": snapshot.health,
+        }
+        with self.condition:
+            if entry["number"] is None:
+                return  # Camera was removed
+            previous = self.cameras.get(camera.camera_id)
+            if previous == entry:
+                return
+            self.total += entry["currently_in"] - (previous["currently_in"] if previous else 0)
+            self.cameras[camera.camera_id] = entry
+            self.record_change(camera.camera_id)
+
+    def on_registry_event(self, event, camera):
+        """Drop removed cameras so clients see them disappear."""
+        if event != CAMERA_REMOVED:
+            return
+        with self.condition:
+            previous = self.cameras.pop(camera.camera_id, None)
+            if previous is not None:
+                self.total -= previous["currently_in"]
+                self.record_change(camera.camera_id)
+
+    def record_change(self, camera_id):
+        """Bump the version and wake streaming clients. Caller holds the condition."""
+        self.version += 1
+        self.changes.append((self.version, camera_id))
+        self.condition.notify_all()
+
+    def snapshot_body(self):
+        """Return (version, JSON bytes) for the full occupancy document, rebuilt only after changes."""
+        with self.condition:
+            if self.body_version != self.version:
+                document = {"version": self.version, "total": self.total, "cameras": list(self.cameras.values())}
+                self.body = json.dumps(document).encode()
+                self.body_version = self.version
+            return self.version, self.body
+
+    def changes_since(self, version):
+        """Return (version, changed camera dicts, removed ids, total) since a version, or None if too old."""
+        with self.condition:
+            if version == self.version:
+                return self.version, [], [], self.total
+            if not self.changes or self.changes[0][0] > version + 1:
+                return None  # The client fell further behind than the change log reaches
+            changed_ids = set()
+            for change_version, camera_id in reversed(self.changes):
+                if change_version <= version:
+                    break
+                changed_ids.add(camera_id)
+            changed = [self.cameras[camera_id] for camera_id in changed_ids if camera_id in self.cameras]
+            removed = [camera_id for camera_id in changed_ids if camera_id not in self.cameras]
+            return self.version, changed, removed, self.total
+
+    def wait_for_change(self, version, timeout):
+        """Block until the version moves past 'version' or the timeout passes."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+def create_app(cache):
+    """Build the Flask app serving occupancy from an OccupancyCache."""
+    app = Flask(__name__)
+
+    @app.route("/api/occupancy")
+    def occupancy():
+        version, body = cache.snapshot_body()
+        etag = f'"{cache.started}-{version}"'
+        if etag in request.headers.get("If-None-Match", ""):
+            return Response(status=304, headers={"ETag": etag})
+        return Response(body, mimetype="application/json", headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+    @app.route("/metrics")
+    def prometheus_metrics():
+        return Response(metrics.REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+    @app.route("/api/stream")
+    def stream():
+        def events():
+            # Start with the full document, then send only what changed
+            version, body = cache.snapshot_body()
+            yield f"event: snapshot\nid: {version}\ndata: {body.decode()}\n\n"
+            while True:
+                new_version = cache.wait_for_change(version, STREAM_HEARTBEAT)
+                if new_version == version:
+                    yield ": keep-alive\n\n"
+                    continue
+                changes = cache.changes_since(version)
+                if changes is None:
+                    version, body = cache.snapshot_body()
+                    yield f"event: snapshot\nid: {version}\ndata: {body.decode()}\n\n"
+                    continue
+                version, changed, removed, total = changes
+                data = json.dumps({"version": version, "total": total, "cameras": changed, "removed": removed})
+                yield f"event: update\nid: {version}\ndata: {data}\n\n"
+
+        return Response(events(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    return app
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Request handler that doesn't print a line per request."""
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+class ApiServer:
+    """Embedded HTTP server for the occupancy API, run in a background thread."""
+
+    def __init__(self, registry, engine, host="127.0.0.1", port=8080):
+        if Flask is None:
+            raise RuntimeError("The HTTP API needs Flask: pip install flask")
+        self.cache = OccupancyCache(registry, engine)
+        self.server = make_server(host, port, create_app(self.cache), threaded=True,
+                                  request_handler=QuietRequestHandler)
+        self.thread = None
+
+    def start(self):
+        """Start serving requests."""
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        print(f"Occupancy API listening on http://{self.server.host}:{self.server.port}/api/occupancy")
+
+    def stop(self):
+        """Stop serving requests."""
+        self.server.shutdown()
+        self.cache.close()
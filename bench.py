@@ -0,0 +1,226 @@
+# bench.py
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource  # Unix only; CPU and memory are reported as n/a without it
+except ImportError:
+    resource = None
+
+SIZES = (10, 100, 1000)  # Camera counts benchmarked by default
+SCENARIOS = ("requests", "pipeline", "database")
+ROUNDS = 5  # Polls of every camera in the requests scenario
+DURATION = 10  # Seconds the pipeline scenario runs
+DB_ROWS_PER_CAMERA = 100  # Rows written per camera in the database scenario
+REGRESSION_THRESHOLD = 0.2  # Flag results 20% worse than the baseline
+RESULT_POLL_INTERVAL = 1  # Seconds between checks that a benchmark process is still running
+
+def percentile(values, q):
+    """Return the q-quantile (0..1) of a list of numbers, or None if it is empty."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def bench_requests(camera_configs, rounds=ROUNDS):
+    """Time Camera.get_counts against every camera, polled concurrently like the engine does."""
+    from camera import cameras_from_config
+    from poller import POLL_WORKERS
+
+    cameras = cameras_from_config({"cameras": camera_configs})
+    latencies = []
+    failures = 0
+
+    def poll(camera):
+        start = time.perf_counter()
+        counts = camera.get_counts()
+        return time.perf_counter() - start, counts is None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=POLL_WORKERS) as executor:
+        for _ in range(rounds):
+            for latency, failed in executor.map(poll, cameras):
+                latencies.append(latency)
+                failures += failed
+    elapsed = time.perf_counter() - started
+    for camera in cameras:
+        camera.close()
+    return {
+        'throughput': len(latencies) / elapsed, 'unit': "polls/s",
+        'p50': percentile(latencies, 0.5), 'p99': percentile(latencies, 0.99), 'failures': failures,
+    }
+
+def bench_pipeline(camera_configs, duration=DURATION):
+    """Run the polling engine and logger (text log + database) against the cameras for a while."""
+    import metrics
+    from camera import cameras_from_config
+    from logger import start_logging
+    from poller import PollingEngine
+    from registry import CameraRegistry
+
+    registry = CameraRegistry(cameras_from_config({"cameras": camera_configs}))
+    engine = PollingEngine(registry, interval=1)
+    logger = start_logging(registry, engine)
+    snapshots = []
+    engine.subscribe(snapshots.append)
+
+    started = time.perf_counter()
+    engine.start()
+    time.sleep(duration)
+    engine.stop()
+    logger.close()
+    elapsed = time.perf_counter() - started
+    for camera in registry:
+        camera.close()
+    return {
+        'throughput': len(snapshots) / elapsed, 'unit': "snapshots/s",
+        'p50': metrics.POLL_SECONDS.quantile(0.5), 'p99': metrics.POLL_SECONDS.quantile(0.99),
+        'rows_written': logger.db_writer.rows_written, 'lines_written': logger.events_log.lines_written,
+        'failures': sum(1 for snapshot in snapshots if snapshot.error),
+    }
+
+def bench_database(camera_configs, rows_per_camera=DB_ROWS_PER_CAMERA):
+    """Push rows through the write-behind DatabaseWriter as fast as they can be queued."""
+    import metrics
+    from database import DatabaseWriter
+
+    writer = DatabaseWriter("bench.db")
+    writer.start()
+    now = time.time()
+    started = time.perf_counter()
+    for i in range(rows_per_camera):
+        for camera in camera_configs:
+            writer.insert_log(now + i, camera['id'], camera['ip'], i, 0, i, entered=1)
+    writer.close()
+    elapsed = time.perf_counter() - started
+    return {
+        'throughput': writer.rows_written / elapsed, 'unit': "rows/s",
+        'p50': metrics.DB_FLUSH_SECONDS.quantile(0.5), 'p99': metrics.DB_FLUSH_SECONDS.quantile(0.99),
+        'rows_written': writer.rows_written, 'failures': writer.errors,
+    }
+
+BENCHMARKS = {
+    'requests': bench_requests,
+    'pipeline': bench_pipeline,
+    'database': bench_database,
+}
+
+def cpu_seconds():
+    """Return the user + system CPU time used by this process so far."""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def run_in_child(scenario, camera_configs, results):
+    """Run one benchmark in a fresh process and working directory, adding its CPU and memory use."""
+    with tempfile.TemporaryDirectory(prefix="bench-") as work_dir:
+        os.chdir(work_dir)  # The database and logs are written here and thrown away afterwards
+        import camera, database, logger, poller  # Load modules up front so imports aren't measured
+        cpu_before = cpu_seconds() if resource else None
+        started = time.perf_counter()
+        result = BENCHMARKS[scenario](camera_configs)
+        wall = time.perf_counter() - started
+        os.chdir(os.path.dirname(work_dir))
+    if resource:
+        result['cpu_seconds'] = cpu_seconds() - cpu_before
+        result['cpu_percent'] = 100 * result['cpu_seconds'] / wall
+        result['max_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux reports kilobytes
+    results.put(result)
+
+def run_benchmark(scenario, fleet, count):
+    """Run a scenario against the first 'count' cameras of a fleet, isolated in its own process."""
+    context = multiprocessing.get_context("spawn")  # Clean metrics and memory for every run
+    results = context.Queue()
+    process = context.Process(target=run_in_child, args=(scenario, fleet.camera_configs()[:count], results))
+    process.start()
+    result = None
+    while result is None:
+        try:
+            result = results.get(timeout=RESULT_POLL_INTERVAL)
+        except queue.Empty:
+            if not process.is_alive() and results.empty():
+                process.join()
+                raise RuntimeError(f"{scenario} benchmark with {count} cameras failed (exit code {process.exitcode})")
+    process.join()
+    return dict(result, scenario=scenario, cameras=count)
+
+def format_result(result):
+    """Return one line of the results table."""
+    def ms(seconds):
+        return "-" if seconds is None else f"{seconds * 1000:.1f}"
+
+    def number(value, spec):
+        return "n/a" if value is None else format(value, spec)
+
+    return (f"{result['scenario']:<10}{result['cameras']:>8}{result['throughput']:>14.1f} {result['unit']:<12}"
+            f"{ms(result['p50']):>9}{ms(result['p99']):>9}{number(result.get('cpu_percent'), '.0f'):>7}"
+            f"{number(result.get('max_rss_mb'), '.0f'):>8}{result.get('failures', 0):>9}")
+
+def compare(results, baseline_file, threshold=REGRESSION_THRESHOLD):
+    """Print results that are worse than a saved baseline and return how many there were."""
+    with open(baseline_file) as f:
+        baseline = {(entry['scenario'], entry['cameras']): entry for entry in json.load(f)}
+    regressions = 0
+    for result in results:
+        base = baseline.get((result['scenario'], result['cameras']))
+        if not base:
+            continue
+        checks = [("throughput", result['throughput'] < base['throughput'] * (1 - threshold))]
+        if result['p99'] is not None and base.get('p99'):
+            checks.append(("p99", result['p99'] > base['p99'] * (1 + threshold)))
+        for name, worse in checks:
+            if worse:
+                regressions += 1
+                print(f"REGRESSION {result['scenario']} x{result['cameras']}: {name} {result[name]:.4g} vs baseline {base[name]:.4g}")
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark polling, parsing and logging against simulated cameras")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="Camera counts to test (default 10 100 1000)")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS), help="Benchmarks to run")
+    parser.add_argument("--latency", type=float, default=0.01, help="Average simulated camera response time in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of simulated reads that fail")
+    parser.add_argument("--traffic", type=float, default=1.0, help="People per second at each simulated camera")
+    parser.add_argument("--json", help="Save the results to this file (use it later as a --baseline)")
+    parser.add_argument("--baseline", help="Compare with results saved by --json and fail on regressions")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    from simulator import SimulatedFleet
+
+    args = parse_args(argv)
+    fleet = SimulatedFleet(max(args.sizes), traffic=args.traffic, latency=args.latency, error_rate=args.error_rate, seed=1)
+    fleet.start()
+
+    print(f"{'Scenario':<10}{'Cameras':>8}{'Throughput':>14} {'':<12}{'p50 ms':>9}{'p99 ms':>9}{'CPU %':>7}{'RSS MB':>8}{'Failures':>9}")
+    results = []
+    failed = 0
+    try:
+        for scenario in args.scenarios:
+            for count in args.sizes:
+                try:
+                    result = run_benchmark(scenario, fleet, count)
+                except RuntimeError as err:
+                    failed += 1
+                    print(f"ERROR {err}", flush=True)
+                    continue
+                results.append(result)
+                print(format_result(result), flush=True)
+    finally:
+        fleet.stop()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+    if args.baseline and compare(results, args.baseline):
+        return 1
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,183 @@
+# camera.py
+
+import json
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
+import xml.etree.ElementTree as ET
+import metrics
+
+# Configuration
+CONNECT_TIMEOUT = 2  # Seconds to wait for a camera to accept the connection
+READ_TIMEOUT = 3  # Seconds to wait for a camera to answer once connected
+POOL_CONNECTIONS = 1  # Each camera is a single host, so one connection pool is enough
+POOL_MAXSIZE = 2  # Keep-alive connections per camera (a poll and a reset can overlap)
+MAX_RETRIES = 2  # Retries for GET requests answered with a 5xx error before giving up on a poll
+RETRY_BACKOFF = 0.3  # Backoff factor between retries (0.3 s, 0.6 s, ...)
+RESET_WORKERS = 32  # Maximum number of reset requests sent at the same time
+RESET_ATTEMPTS = 3  # Attempts per camera before a reset is reported as failed
+RESET_RETRY_DELAY = 0.5  # Seconds between reset attempts
+
+# Outcome of resetting one camera
+ResetResult = namedtuple("ResetResult", ["camera", "ok", "attempts", "error"])
+
+class Camera:
+    def __init__(self, ip, username, password, interval=None, camera_id=None, pool_maxsize=POOL_MAXSIZE, max_retries=MAX_RETRIES, retry_backoff=RETRY_BACKOFF):
+        self.ip = ip
+        self.username = username
+        self.password = password
+        self.interval = interval  # Seconds between polls, or None for the engine default
+        self.camera_id = camera_id or ip  # Stable key used by the registry, logs and database
+        self.base_url = f"http://{ip}/iAPI/apps.cgi"
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.session = None
+        self.session_lock = threading.Lock()
+        self.last_error = None
+
+    def get_session(self):
+        """Return this camera's keep-alive session, creating it on first use."""
+        with self.session_lock:
+            if self.session is None:
+                # Only retry error responses; connection failures and timeouts are left to the
+                # poll scheduler's backoff so an offline camera costs one attempt per poll
+                retry = Retry(total=self.max_retries, connect=0, read=0, backoff_factor=self.retry_backoff,
+                              status_forcelist=(500, 502, 503, 504), allowed_methods=frozenset(["GET"]))
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=self.pool_maxsize, max_retries=retry)
+                session = requests.Session()
+                session.auth = HTTPBasicAuth(self.username, self.password)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self.session = session
+            return self.session
+
+    def reset_session(self):
+        """Drop the current session so the next request opens fresh connections."""
+        with self.session_lock:
+            if self.session is not None:
+                self.session.close()
+                self.session = None
+
+    def close(self):
+        """Close any pooled connections held for this camera."""
+        self.reset_session()
+
+    def send_request(self):
+        """Send a GET request to the API to retrieve the person count data."""
+        start = time.perf_counter()
+        try:
+            response = self.get_session().get(f"{self.base_url}?action=read&path=personcount.default",
+                                              timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+            response.raise_for_status()
+            self.last_error = None
+            return response.text
+        except requests.exceptions.HTTPError as http_err:
+            print(f"HTTP error occurred: {http_err}")
+            self.record_error("http", http_err)
+        except requests.exceptions.Timeout as timeout_err:
+            print(f"Request timed out: {timeout_err}")
+            self.record_error("timeout", timeout_err)
+        except requests.exceptions.ConnectionError as conn_err:
+            print(f"Connection error occurred: {conn_err}")
+            self.record_error("connection", conn_err)
+            self.reset_session()
+        except requests.exceptions.RequestException as req_err:
+            print(f"Request error occurred: {req_err}")
+            self.record_error("request", req_err)
+        finally:
+            metrics.CAMERA_REQUEST_SECONDS.observe(time.perf_counter() - start, camera=self.camera_id)
+        return ""
+
+    def record_error(self, kind, err):
+        """Remember the last error and count it by kind."""
+        self.last_error = str(err)
+        metrics.CAMERA_ERRORS.inc(camera=self.camera_id, kind=kind)
+
+    def get_counts(self):
+        """Retrieve the in and out counts from the API, or None if the camera could not be read."""
+        try:
+            response_text = self.send_request()
+            if not response_text:
+                return None
+            with metrics.CAMERA_PARSE_SECONDS.time():
+                if response_text.startswith("Content-Type: text/xml"):
+                    response_text = response_text.split("\n", 1)[1].strip()
+
+                root = ET.fromstring(response_text)
+                in_count = root.find(".//parameter[@name='inCountTotal']").text if root.find(".//parameter[@name='inCountTotal']") is not None else "0"
+                out_count = root.find(".//parameter[@name='outCountTotal']").text if root.find(".//parameter[@name='outCountTotal']") is not None else "0"
+                currently_in = str(int(in_count) - int(out_count))
+
+            return int(in_count), int(out_count), int(currently_in)
+
+        except ET.ParseError as parse_err:
+            print(f"XML parse error occurred: {parse_err}")
+            self.record_error("parse", parse_err)
+            return None
+
+    def reset_counts(self):
+        """Send a POST request to reset the camera counts. Returns True on success."""
+        reset_xml = '<app name="personcount"><instance name="default"><parameter name="manualReset">true</parameter></instance></app>'
+        try:
+            response = self.get_session().post(f"{self.base_url}?action=Update",
+                                               data=reset_xml,
+                                               headers={"Content-Type": "text/xml"},
+                                               timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+            response.raise_for_status()
+            print(f"Successfully reset counts for camera at {self.ip}")
+            self.last_error = None
+            return True
+        except requests.exceptions.ConnectionError as conn_err:
+            print(f"Failed to reset counts for camera at {self.ip}: {conn_err}")
+            self.last_error = str(conn_err)
+            self.reset_session()
+        except requests.exceptions.RequestException as req_err:
+            print(f"Failed to reset counts for camera at {self.ip}: {req_err}")
+            self.last_error = str(req_err)
+        return False
+
+def reset_camera(camera, attempts=RESET_ATTEMPTS, retry_delay=RESET_RETRY_DELAY):
+    """Reset one camera, retrying failures, and return a ResetResult."""
+    for attempt in range(1, attempts + 1):
+        if camera.reset_counts():
+            return ResetResult(camera, True, attempt, None)
+        if attempt < attempts:
+            time.sleep(retry_delay)
+    return ResetResult(camera, False, attempts, camera.last_error)
+
+def reset_cameras(cameras, max_workers=RESET_WORKERS, attempts=RESET_ATTEMPTS):
+    """Reset all cameras at once with bounded parallelism and return a ResetResult per camera."""
+    cameras = list(cameras)
+    if not cameras:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(cameras)), thread_name_prefix="reset") as executor:
+        return list(executor.map(lambda camera: reset_camera(camera, attempts), cameras))
+
+def load_config(config_file):
+    """Read a JSON config file and return the parsed config."""
+    with open(config_file, 'r') as f:
+        return json.load(f)
+
+def cameras_from_config(config_data):
+    """Build Camera objects from the 'cameras' section of a config."""
+    return [Camera(cam['ip'], cam['username'], cam['password'], interval=cam.get('interval'), camera_id=cam.get('id'))
+            for cam in config_data['cameras']]
+
+def config_from_camera(camera):
+    """Return the config entry for a camera (the inverse of cameras_from_config)."""
+    entry = {
+        "ip": camera.ip,
+        "username": camera.username,
+        "password": camera.password
+    }
+    if camera.camera_id != camera.ip:
+        entry["id"] = camera.camera_id
+    if camera.interval:
+        entry["interval"] = camera.interval
+    return entry
@@ -0,0 +1,117 @@
+# collector.py
+
+import signal
+import threading
+import time
+import metrics
+from camera import reset_cameras
+from logger import start_logging
+from poller import PollingEngine
+from registry import CameraRegistry
+from shard import ShardedEngine
+from statecache import StateCache
+from timeseries import TrendStore
+from zones import ZoneTracker, zones_from_config
+
+METRICS_DUMP_INTERVAL = 15  # Seconds between metrics file dumps
+
+class Collector:
+    """Polling engine and logging pipeline, usable with or without the dashboard."""
+
+    def __init__(self, cameras, compress_old_logs=False, workers=None, zones=None):
+        self.registry = CameraRegistry(cameras)  # The main set of cameras, keyed by camera_id
+        if workers:
+            self.engine = ShardedEngine(self.registry, workers)  # Cameras polled by worker processes
+        else:
+            self.engine = PollingEngine(self.registry)  # Single poller shared by every consumer
+        metrics.OCCUPANCY_TOTAL.set_function(self.engine.total_occupancy)
+
+        # Counts saved by the last run are shown until the first poll comes back
+        self.state_cache = StateCache(self.registry, self.engine)
+        self.engine.restore(self.state_cache.snapshots())
+        self.logger = start_logging(self.registry, self.engine, compress_old_logs)
+        self.zones = ZoneTracker(self.registry, self.engine, zones_from_config(zones))  # "zones" section of the config
+        self.zones.subscribe(self.logger.log_zone_state)
+        self.trends = TrendStore(self.registry, self.engine)  # Recent occupancy history, kept in memory
+        self.api = None
+        self.metrics_file = None
+        self.stopped = threading.Event()
+
+    def dump_metrics(self, path, interval=METRICS_DUMP_INTERVAL):
+        """Write Prometheus-format metrics to a file every 'interval' seconds until stopped."""
+        self.metrics_file = path
+
+        def run():
+            while not self.stopped.wait(interval):
+                self.write_metrics_file()
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def write_metrics_file(self):
+        """Write the current metrics to the metrics file, if one was configured."""
+        if self.metrics_file:
+            try:
+                metrics.REGISTRY.dump(self.metrics_file)
+            except OSError as err:
+                print(f"Failed to write metrics to {self.metrics_file}: {err}")
+
+    def serve_api(self, host, port):
+        """Serve cached occupancy over HTTP (needs Flask)."""
+        from api import ApiServer  # Flask is only imported when the API is enabled
+        self.api = ApiServer(self.registry, self.engine, host, port)
+        self.api.start()
+
+    def start(self):
+        """Start polling cameras."""
+        self.state_cache.start()
+        self.engine.start()
+
+    def stop(self):
+        """Stop polling and flush everything the logger has queued."""
+        if self.stopped.is_set():
+            return
+        self.engine.stop()
+        if self.api:
+            self.api.stop()
+        self.zones.close()
+        self.trends.close()
+        self.state_cache.close()
+        self.logger.close()
+        self.stopped.set()
+        self.write_metrics_file()
+
+    def reset_counts(self):
+        """Reset every camera at once and return a ResetResult per camera.
+
+        Once the resets have landed, the logger takes the next reading of each reset camera
+        as its new baseline, so the jump back to zero (or a poll that was in flight during
+        the reset) is never logged as entries or exits.
+        """
+        results = reset_cameras(self.registry)
+        self.logger.rebaseline([result.camera.camera_id for result in results if result.ok])
+
+        current_time = time.strftime("%H:%M:%S", time.localtime())
+        for result in results:
+            number = self.registry.number(result.camera.camera_id)
+            if result.ok:
+                self.logger.append_to_events_log(f"{current_time}, Camera {number} reset.\n")
+            else:
+                self.logger.append_to_events_log(f"{current_time}, Camera {number} reset failed: {result.error}\n")
+        return results
+
+    def run_forever(self):
+        """Run as a headless service until SIGINT or SIGTERM is received."""
+        shutdown = threading.Event()
+
+        def handle_signal(signum, frame):
+            print(f"Received signal {signum}, shutting down...")
+            shutdown.set()
+
+        signal.signal(signal.SIGINT, handle_signal)
+        signal.signal(signal.SIGTERM, handle_signal)
+
+        self.start()
+        print(f"Collecting from {len(self.registry)} camera(s). Press Ctrl+C to stop.")
+        while not shutdown.wait(1):
+            pass
+        self.stop()
@@ -0,0 +1,688 @@
+# dashboard.py
+
+import time
+import json
+import os
+import queue
+import sqlite3
+import threading
+import tkinter as tk
+from tkinter import Label, Frame, Button, simpledialog, filedialog, messagebox
+import metrics
+from camera import Camera, load_config, cameras_from_config, config_from_camera
+from export import REPORTS, export_to_file, parse_time
+from timeseries import TOTAL
+
+# Configuration
+QUEUE_DRAIN_INTERVAL = 250  # Check for new snapshots every 250 milliseconds
+FLASH_DURATION = 1000  # 1 second in milliseconds for flashing red
+DIAGNOSTICS_INTERVAL = 2000  # Refresh the diagnostics panel every 2 seconds
+DIAGNOSTICS_CAMERAS = 25  # Slowest cameras listed in the diagnostics panel
+EXPORT_FLUSH_TIMEOUT = 5  # Seconds to wait for queued rows to reach the database before exporting
+MAX_COLUMNS = 4  # Camera tiles per row
+TILE_WIDTH = 180
+TILE_HEIGHT = 130
+TILE_PADDING = 10
+TILE_COLOR = "#FF964F"
+HEALTH_COLORS = {"healthy": TILE_COLOR, "degraded": "#d9a441", "offline": "#8c8c8c"}
+ZONE_COLUMNS = 6  # Zone tiles per row
+BANNER_COLOR = "#72a160"
+BANNER_ALERT_COLOR = "#eb3b3b"
+ZONE_COLOR = "#5c8a4c"
+ZONE_ALERT_COLOR = "#eb3b3b"
+SPARKLINE_INTERVAL = 5000  # Redraw trend sparklines every 5 seconds
+TILE_TREND_SECONDS = 600  # Camera tiles show the last 10 minutes
+TOTAL_TREND_SECONDS = 24 * 3600  # The total shows the last 24 hours
+SPARKLINE_POINTS = 120  # Points per sparkline
+
+class Sparkline:
+    """Trend line on a small Canvas. The line item is created once and only its points are moved."""
+
+    def __init__(self, parent, width, height, bg, color="white"):
+        self.width = width
+        self.height = height
+        self.canvas = tk.Canvas(parent, width=width, height=height, bg=bg, highlightthickness=0)
+        self.line = self.canvas.create_line(0, 0, 0, 0, fill=color, width=1.5, state="hidden")
+        self.key = None  # (series version, window position) last drawn
+
+    def draw(self, store, series_id, seconds, points=SPARKLINE_POINTS, now=None):
+        """Redraw from a TrendStore, skipping the work if neither the data nor the window has moved."""
+        now = time.time() if now is None else now
+        key = (store.version(series_id), int(now * points // seconds))
+        if key == self.key:
+            return
+        self.key = key
+        _, values = store.window(series_id, seconds, points, now)
+        known = [(i, value) for i, value in enumerate(values) if value is not None]
+        if len(known) < 2:
+            self.canvas.itemconfigure(self.line, state="hidden")
+            return
+        low = min(value for _, value in known)
+        span = max(value for _, value in known) - low or 1
+        step = self.width / max(1, len(values) - 1)
+        coords = []
+        for i, value in known:
+            coords += [i * step, self.height - 2 - (value - low) * (self.height - 4) / span]
+        self.canvas.coords(self.line, *coords)
+        self.canvas.itemconfigure(self.line, state="normal")
+
+    def set_background(self, color):
+        self.canvas.config(bg=color)
+
+class CameraTile:
+    """Widgets for one camera box. Labels are only reconfigured when their text changes."""
+
+    def __init__(self, parent, on_remove):
+        self.frame = Frame(parent, bg=TILE_COLOR, bd=0, relief="flat")
+        self.frame.grid_propagate(False)
+        self.frame.config(height=TILE_HEIGHT, width=TILE_WIDTH)
+        self.frame.grid_columnconfigure(0, weight=1)
+
+        self.labels = {
+            'ip': Label(self.frame, text="", bg=TILE_COLOR, fg="white", font=("Helvetica", 12, "bold")),
+            'entered': Label(self.frame, text="Entered: 0", bg=TILE_COLOR, fg="white", font=("Helvetica", 12, "bold")),
+            'exited': Label(self.frame, text="Exited: 0", bg=TILE_COLOR, fg="white", font=("Helvetica", 12, "bold")),
+        }
+        self.texts = {key: label.cget("text") for key, label in self.labels.items()}
+        for label in self.labels.values():
+            label.pack(fill="x", padx=5, pady=2)
+
+        # Occupancy over the last few minutes
+        self.sparkline = Sparkline(self.frame, TILE_WIDTH - 10, 20, TILE_COLOR)
+        self.sparkline.canvas.pack(padx=5)
+
+        # Add the "Remove" button inside each camera box
+        remove_button = Button(self.frame, text="Remove", bg="red", fg="white", command=on_remove)
+        remove_button.pack(side="bottom", fill="x", padx=5, pady=5)
+
+        self.position = None
+        self.health = "healthy"
+        self.pending = None  # Snapshot waiting for the tile to scroll into view
+
+    def set_text(self, key, text):
+        """Change a label's text, skipping the Tk call if it is already showing it."""
+        if self.texts[key] != text:
+            self.texts[key] = text
+            self.labels[key].config(text=text)
+
+    def show(self, snapshot):
+        """Display a snapshot's counts."""
+        self.pending = None
+        self.set_text('entered', f"Entered: {snapshot.entered}")
+        self.set_text('exited', f"Exited: {snapshot.exited}")
+        self.set_health(snapshot.health)
+
+    def set_health(self, health):
+        """Colour the tile by camera health: orange when healthy, amber when degraded, grey when offline."""
+        if self.health != health:
+            self.health = health
+            color = HEALTH_COLORS.get(health, TILE_COLOR)
+            self.frame.config(bg=color)
+            for label in self.labels.values():
+                label.config(bg=color)
+            self.sparkline.set_background(color)
+
+    def place(self, row, column):
+        """Grid the tile at a position, only moving it if the position changed."""
+        if self.position != (row, column):
+            self.position = (row, column)
+            self.frame.grid(row=row, column=column, sticky="nsew", padx=TILE_PADDING, pady=TILE_PADDING)
+
+    def destroy(self):
+        """Destroy the tile's widgets."""
+        self.frame.destroy()
+
+class ZoneTile:
+    """Occupancy box for one zone, shown under the total. Click it to change the zone's limit."""
+
+    def __init__(self, parent, on_click):
+        self.frame = Frame(parent, bg=ZONE_COLOR, bd=0, relief="flat")
+        self.name_label = Label(self.frame, text="", bg=ZONE_COLOR, fg="white", font=("Helvetica", 11, "bold"))
+        self.name_label.pack(fill="x", padx=5, pady=(5, 0))
+        self.count_label = Label(self.frame, text="", bg=ZONE_COLOR, fg="white", font=("Helvetica", 14))
+        self.count_label.pack(fill="x", padx=5, pady=(0, 5))
+        for widget in (self.frame, self.name_label, self.count_label):
+            widget.bind("<Button-1>", lambda event: on_click())
+        self.state = None
+
+    def show(self, state):
+        """Display a zone's occupancy, turning red while it is over its limit."""
+        if state == self.state:
+            return
+        self.state = state
+        self.name_label.config(text=state.name)
+        self.count_label.config(text=f"{state.occupancy} / {state.limit}" if state.limit else str(state.occupancy))
+        color = ZONE_ALERT_COLOR if state.over_limit else ZONE_COLOR
+        for widget in (self.frame, self.name_label, self.count_label):
+            widget.config(bg=color)
+
+# GUI Application
+class Dashboard:
+    def __init__(self, master, collector, occupancy_limit=None):
+        self.master = master
+        self.master.title("People Counting Dashboard")
+        self.master.configure(bg="#d1d07d")  # Pastel yellow background
+
+        self.collector = collector
+        self.registry = collector.registry  # This is the main set of cameras, keyed by camera_id
+        self.occupancy_limit = occupancy_limit
+        self.logger = collector.logger
+        self.engine = collector.engine
+        self.is_flashing = False
+        self.banner_color = BANNER_COLOR  # Current background of the total occupancy box
+
+        # Callables queued by background threads to run on the Tk thread
+        self.ui_calls = queue.Queue()
+
+        # Snapshots are pushed from the polling thread and drained on the Tk thread
+        self.snapshots = {}  # camera_id -> latest snapshot shown
+        self.snapshot_queue = queue.Queue()
+        if self.engine:
+            self.engine.subscribe(self.snapshot_queue.put)
+
+        # Zone changes are pushed by the zone tracker and drained the same way
+        self.zones = collector.zones
+        self.zone_queue = queue.Queue()
+        self.zones.subscribe(self.zone_queue.put)
+        metrics.QUEUE_DEPTH.set_function(self.snapshot_queue.qsize, queue="dashboard")
+        self.diagnostics_window = None
+
+        # Create a grid system to make resizing responsive
+        self.master.columnconfigure(0, weight=1)
+        self.master.rowconfigure(2, weight=1)
+
+        # Create the total occupancy display at the top
+        self.total_frame = Frame(master, bg=BANNER_COLOR, bd=0, relief="flat")
+        self.total_frame.grid(row=0, column=0, columnspan=4, sticky="ew", padx=10, pady=(10, 0))
+        self.total_frame.columnconfigure(0, weight=1)
+
+        self.total_currently_in_label = Label(self.total_frame, text="Current Occupancy: 0", bg=BANNER_COLOR, fg="white", font=("Helvetica", 24))
+        self.total_currently_in_label.grid(row=0, column=0, sticky="ew")
+
+        if self.occupancy_limit:
+            self.occupancy_limit_label = Label(self.total_frame, text=f"Occupancy Limit: {self.occupancy_limit}", bg=BANNER_COLOR, fg="white", font=("Helvetica", 12))
+            self.occupancy_limit_label.grid(row=1, column=0, pady=5, sticky="ew")
+        else:
+            self.occupancy_limit_label = None
+
+        # One tile per zone from the config, under the total
+        self.zone_tiles = {}
+        zones_frame = Frame(self.total_frame, bg=BANNER_COLOR)
+        zones_frame.grid(row=2, column=0, pady=(0, 5))
+
+        # Total occupancy over the last day, drawn from the in-memory trend store
+        self.trends = collector.trends
+        self.total_sparkline = Sparkline(self.total_frame, 400, 40, BANNER_COLOR)
+        self.total_sparkline.canvas.grid(row=3, column=0, pady=(0, 10))
+        for i, state in enumerate(self.zones.states()):
+            tile = ZoneTile(zones_frame, lambda zone_id=state.zone_id: self.set_zone_limit(zone_id))
+            tile.frame.grid(row=i // ZONE_COLUMNS, column=i % ZONE_COLUMNS, padx=5, pady=5)
+            tile.show(state)
+            self.zone_tiles[state.zone_id] = tile
+
+        # White line separator
+        self.separator = Frame(master, bg="white", height=2)
+        self.separator.grid(row=1, column=0, columnspan=4, sticky="ew", pady=(10, 10))
+
+        # Camera tiles live in a scrollable canvas so large fleets stay usable
+        self.tiles_canvas = tk.Canvas(master, bg="#d1d07d", highlightthickness=0,
+                                      width=MAX_COLUMNS * (TILE_WIDTH + 2 * TILE_PADDING),
+                                      height=3 * (TILE_HEIGHT + 2 * TILE_PADDING))
+        self.tiles_canvas.grid(row=2, column=0, columnspan=4, sticky="nsew")
+        self.tiles_scrollbar = tk.Scrollbar(master, orient="vertical", command=self.on_scroll)
+        self.tiles_scrollbar.grid(row=2, column=4, sticky="ns")
+        self.tiles_canvas.configure(yscrollcommand=self.on_canvas_scrolled)
+
+        self.tiles_frame = Frame(self.tiles_canvas, bg="#d1d07d")
+        self.tiles_window = self.tiles_canvas.create_window((0, 0), window=self.tiles_frame, anchor="nw")
+        self.tiles_frame.bind("<Configure>", lambda event: self.tiles_canvas.configure(scrollregion=self.tiles_canvas.bbox("all")))
+        self.tiles_canvas.bind("<Configure>", lambda event: self.tiles_canvas.itemconfigure(self.tiles_window, width=event.width))
+        self.tiles_canvas.bind_all("<MouseWheel>", lambda event: self.on_scroll("scroll", -event.delta // 120, "units"))
+        self.tiles_canvas.bind_all("<Button-4>", lambda event: self.on_scroll("scroll", -1, "units"))
+        self.tiles_canvas.bind_all("<Button-5>", lambda event: self.on_scroll("scroll", 1, "units"))
+
+        # Camera tiles keyed by camera_id, plus the running total of people currently in
+        self.camera_tiles = {}
+        self.total_currently_in = 0
+        self.add_camera_frame = None
+
+        # Initialize with any provided cameras
+        for camera in self.registry:
+            self.camera_tiles[camera.camera_id] = self.create_camera_tile(camera)
+        self.add_camera_button()
+        self.layout_camera_tiles()
+
+        # Buttons at the bottom
+        self.create_bottom_buttons()
+
+        # Start draining camera snapshots every QUEUE_DRAIN_INTERVAL
+        self.process_snapshots()
+        self.refresh_sparklines()
+
+    def create_camera_tile(self, camera):
+        """Create the tile for one camera; layout_camera_tiles gives it its position and title."""
+        return CameraTile(self.tiles_frame, lambda: self.remove_camera(camera))
+
+    def layout_camera_tiles(self):
+        """Place every tile and the 'Add Camera' button, moving only those whose slot changed."""
+        num_cameras = len(self.registry)
+        columns = min(num_cameras + 1, MAX_COLUMNS)
+
+        # Configure grid columns to resize dynamically
+        for col in range(MAX_COLUMNS):
+            self.tiles_frame.columnconfigure(col, weight=1 if col < columns else 0)
+
+        for i, camera in enumerate(self.registry):
+            tile = self.camera_tiles[camera.camera_id]
+            tile.place(i // columns, i % columns)
+            tile.set_text('ip', f"Camera {self.registry.number(camera.camera_id)}")
+
+        self.add_camera_frame.grid(row=num_cameras // columns, column=num_cameras % columns,
+                                   sticky="nsew", padx=TILE_PADDING, pady=TILE_PADDING)
+
+    def on_scroll(self, *args):
+        """Scroll the tile canvas (from the scrollbar or mouse wheel)."""
+        self.tiles_canvas.yview(*args)
+
+    def on_canvas_scrolled(self, first, last):
+        """Keep the scrollbar in sync and catch up tiles that have just scrolled into view."""
+        self.tiles_scrollbar.set(first, last)
+        self.refresh_visible_tiles()
+
+    def visible_rows(self):
+        """Return the range of tile rows currently inside the canvas viewport."""
+        row_height = TILE_HEIGHT + 2 * TILE_PADDING
+        top = self.tiles_canvas.canvasy(0)
+        bottom = top + max(self.tiles_canvas.winfo_height(), row_height)
+        return range(int(top // row_height), int(bottom // row_height) + 1)
+
+    def refresh_visible_tiles(self):
+        """Show deferred snapshots on tiles that are now visible."""
+        rows = self.visible_rows()
+        for camera_id, tile in self.camera_tiles.items():
+            if tile.position and tile.position[0] in rows:
+                if tile.pending is not None:
+                    tile.show(tile.pending)
+                tile.sparkline.draw(self.trends, camera_id, TILE_TREND_SECONDS)
+
+    def refresh_sparklines(self):
+        """Redraw the total sparkline and those of visible tiles; hidden tiles catch up when scrolled to."""
+        self.total_sparkline.draw(self.trends, TOTAL, TOTAL_TREND_SECONDS)
+        self.refresh_visible_tiles()
+        self.master.after(SPARKLINE_INTERVAL, self.refresh_sparklines)
+
+    def add_camera_button(self):
+        """Create the button for adding a new camera; layout_camera_tiles places it in the next free slot."""
+        self.add_camera_frame = Frame(self.tiles_frame, bg=TILE_COLOR, bd=0, relief="flat")
+        self.add_camera_frame.grid_propagate(False)
+        self.add_camera_frame.config(height=TILE_HEIGHT, width=TILE_WIDTH)
+
+        add_camera_label = Label(self.add_camera_frame, text="+", bg=TILE_COLOR, fg="white", font=("Helvetica", 36, "bold"))
+        add_camera_label.pack(fill="both", expand=True)
+
+        add_camera_button = Button(self.add_camera_frame, text="New Camera", command=self.add_camera)
+        add_camera_button.pack(fill="x", padx=5, pady=5)
+
+    def add_camera(self):
+        """Prompt the user to add a new camera."""
+        ip = simpledialog.askstring("Input", "Enter IP for new Camera:")
+        username = simpledialog.askstring("Input", "Enter Username for new Camera:")
+        password = simpledialog.askstring("Input", "Enter Password for new Camera:", show="*")
+
+        if ip and username and password:
+            new_camera = Camera(ip, username, password)
+
+            # Prevent adding duplicate cameras; the poller and logger pick the camera up from the registry
+            try:
+                self.registry.add(new_camera)
+            except ValueError as err:
+                messagebox.showerror("Error", str(err))
+                return
+            self.camera_tiles[new_camera.camera_id] = self.create_camera_tile(new_camera)
+            self.layout_camera_tiles()
+
+    def remove_camera(self, camera):
+        """Remove a camera from the dashboard."""
+        self.registry.remove(camera.camera_id)
+        snapshot = self.snapshots.pop(camera.camera_id, None)
+        if snapshot is not None:
+            self.total_currently_in -= snapshot.currently_in
+        self.camera_tiles.pop(camera.camera_id).destroy()
+        camera.close()
+        self.layout_camera_tiles()
+        self.update_counts()
+
+    def export_config(self):
+        """Export the current camera configuration to a JSON file."""
+        config_data = {
+            "cameras": [self.camera_config(camera) for camera in self.registry],
+            "occupancy_limit": self.occupancy_limit
+        }
+        if self.zone_tiles:
+            config_data["zones"] = self.zones.config()
+        config_file_path = os.path.join(os.getcwd(), 'camera_config.json')
+        with open(config_file_path, 'w') as config_file:
+            json.dump(config_data, config_file, indent=4)
+        messagebox.showinfo("Export Config", f"Configuration exported to {config_file_path}")
+
+    def camera_config(self, camera):
+        """Return the config entry for a camera."""
+        return config_from_camera(camera)
+
+    def process_snapshots(self):
+        """Drain snapshots queued by the polling thread and refresh the display if any arrived."""
+        with metrics.DASHBOARD_UPDATE_SECONDS.time():
+            self.apply_queued_updates()
+        self.master.after(QUEUE_DRAIN_INTERVAL, self.process_snapshots)
+
+    def apply_queued_updates(self):
+        """Run queued UI calls and show the newest snapshot of each camera that reported."""
+        while True:
+            try:
+                self.ui_calls.get_nowait()()
+            except queue.Empty:
+                break
+
+        changed = {}
+        while True:
+            try:
+                snapshot = self.snapshot_queue.get_nowait()
+            except queue.Empty:
+                break
+            if snapshot.camera.camera_id in self.camera_tiles:
+                changed[snapshot.camera.camera_id] = snapshot  # Only the newest snapshot per camera matters
+
+        if changed:
+            rows = self.visible_rows()
+            for camera_id, snapshot in changed.items():
+                previous = self.snapshots.get(camera_id)
+                self.snapshots[camera_id] = snapshot
+                self.total_currently_in += snapshot.currently_in - (previous.currently_in if previous else 0)
+
+                tile = self.camera_tiles[camera_id]
+                if tile.position and tile.position[0] in rows:
+                    tile.show(snapshot)
+                else:
+                    tile.pending = snapshot  # Off-screen tiles catch up when scrolled into view
+            self.update_counts()
+
+        zone_states = {}
+        while True:
+            try:
+                state = self.zone_queue.get_nowait()
+            except queue.Empty:
+                break
+            zone_states[state.zone_id] = state  # Only the newest state per zone matters
+        for zone_id, state in zone_states.items():
+            self.zone_tiles[zone_id].show(state)
+
+    def update_counts(self):
+        """Update the total occupancy display and the over-limit alert."""
+        total_currently_in = self.total_currently_in
+
+        # Update the total occupancy box
+        text = f"Current Occupancy: {total_currently_in}"
+        if self.total_currently_in_label.cget("text") != text:
+            self.total_currently_in_label.config(text=text)
+
+        # Flash red if over limit
+        if self.occupancy_limit and total_currently_in > self.occupancy_limit:
+            if not self.is_flashing:
+                self.flash_red_background()
+                self.is_flashing = True
+                self.master.after(FLASH_DURATION, self.reset_to_green)
+        else:
+            self.reset_to_green()
+
+    def flash_red_background(self):
+        """Set the background to red when over limit."""
+        self.set_banner_color(BANNER_ALERT_COLOR)
+
+    def reset_to_green(self):
+        """Reset the background to green after flashing or if occupancy is under the limit."""
+        self.is_flashing = False
+        self.set_banner_color(BANNER_COLOR)
+
+    def set_banner_color(self, color):
+        """Recolor the total occupancy box, skipping the Tk calls if it already has that color."""
+        if color == self.banner_color:
+            return
+        self.banner_color = color
+        self.total_frame.config(bg=color)
+        self.total_currently_in_label.config(bg=color)
+        self.total_sparkline.set_background(color)
+        if self.occupancy_limit_label:
+            self.occupancy_limit_label.config(bg=color)
+
+    def reset_all_camera_counts(self):
+        """Reset counts for all cameras in the background and report the results when done."""
+        self.reset_button.config(state="disabled", text="Resetting...")
+
+        def run_reset():
+            results = self.collector.reset_counts()
+            self.ui_calls.put(lambda: self.show_reset_report(results))
+
+        threading.Thread(target=run_reset, daemon=True).start()
+
+    def show_reset_report(self, results):
+        """Re-enable the reset button and show which cameras were reset."""
+        self.reset_button.config(state="normal", text="Reset Counts")
+        failed = [result for result in results if not result.ok]
+        current_time = time.strftime("%H:%M:%S", time.localtime())
+        print(f"Reset {len(results) - len(failed)} of {len(results)} cameras at {current_time}.")
+
+        if failed:
+            lines = [f"Camera {self.registry.number(result.camera.camera_id)} ({result.camera.ip}): {result.error}" for result in failed]
+            messagebox.showwarning("Reset Counts", f"Reset {len(results) - len(failed)} of {len(results)} cameras.\n\nFailed:\n" + "\n".join(lines))
+        else:
+            messagebox.showinfo("Reset Counts", f"Reset all {len(results)} cameras.")
+
+    def create_bottom_buttons(self):
+        """Create buttons at the bottom of the dashboard."""
+        button_frame = Frame(self.master, bg="#d1d07d", bd=0)
+        button_frame.grid(row=10, column=0, columnspan=4, pady=20)
+
+        # Rounded buttons in darker gray with white text
+        button_style = {"bg": "#4D4D4D", "fg": "white", "font": ("Helvetica", 12), "relief": "flat"}
+
+        # Export Config Button
+        export_button = Button(button_frame, text="Export Config", command=self.export_config, **button_style)
+        export_button.grid(row=0, column=0, padx=10)
+
+        # Export History Button
+        self.history_button = Button(button_frame, text="Export History", command=self.export_history, **button_style)
+        self.history_button.grid(row=0, column=1, padx=10)
+
+        # Reset Counts Button
+        self.reset_button = Button(button_frame, text="Reset Counts", command=self.reset_all_camera_counts, **button_style)
+        self.reset_button.grid(row=0, column=2, padx=10)
+
+        # Diagnostics Button
+        diagnostics_button = Button(button_frame, text="Diagnostics", command=self.show_diagnostics, **button_style)
+        diagnostics_button.grid(row=0, column=4, padx=10)
+
+        # Set Occupancy Limit Button
+        occupancy_button = Button(button_frame, text="Occupancy Limit", command=self.set_occupancy_limit, **button_style)
+        occupancy_button.grid(row=0, column=3, padx=10)
+
+    def export_history(self):
+        """Ask what history to export, then stream it to a CSV or JSON Lines file in the background."""
+        dialog = tk.Toplevel(self.master)
+        dialog.title("Export History")
+        fields = {}
+        for row, (label, default) in enumerate([("Report", "events"), ("From (YYYY-MM-DD)", ""),
+                                                ("To (YYYY-MM-DD)", ""), ("Camera ids (comma separated)", "")]):
+            Label(dialog, text=label).grid(row=row, column=0, sticky="w", padx=10, pady=5)
+            fields[label] = tk.StringVar(value=default)
+            if label == "Report":
+                tk.OptionMenu(dialog, fields[label], *REPORTS).grid(row=row, column=1, sticky="ew", padx=10)
+            else:
+                tk.Entry(dialog, textvariable=fields[label]).grid(row=row, column=1, sticky="ew", padx=10)
+
+        def start_export():
+            try:
+                filters = {
+                    'start': parse_time(fields["From (YYYY-MM-DD)"].get().strip()),
+                    'end': parse_time(fields["To (YYYY-MM-DD)"].get().strip(), end=True),
+                    'cameras': [camera_id.strip() for camera_id in fields["Camera ids (comma separated)"].get().split(",")
+                                if camera_id.strip()],
+                }
+            except ValueError as err:
+                messagebox.showerror("Export History", f"Invalid date: {err}", parent=dialog)
+                return
+            report = fields["Report"].get()
+            path = filedialog.asksaveasfilename(parent=dialog, defaultextension=".csv", initialfile=f"{report}.csv",
+                                                filetypes=[("CSV files", "*.csv"), ("JSON Lines files", "*.jsonl")])
+            if not path:
+                return
+            dialog.destroy()
+            self.history_button.config(state="disabled", text="Exporting...")
+
+            def run_export():
+                self.logger.db_writer.flush(EXPORT_FLUSH_TIMEOUT)  # Include rows still waiting to be written
+                try:
+                    count = export_to_file(path, report, **filters)
+                    message = (messagebox.showinfo, f"Exported {count} rows to {path}")
+                except (OSError, sqlite3.Error) as err:
+                    message = (messagebox.showerror, f"Export failed: {err}")
+                self.ui_calls.put(lambda: self.show_export_result(*message))
+
+            threading.Thread(target=run_export, daemon=True).start()
+
+        Button(dialog, text="Export...", command=start_export).grid(row=4, column=0, columnspan=2, pady=10)
+
+    def show_export_result(self, show, message):
+        """Re-enable the export button and report how the export went."""
+        self.history_button.config(state="normal", text="Export History")
+        show("Export History", message)
+
+    def show_diagnostics(self):
+        """Open (or raise) a window with live latency, error and queue statistics."""
+        if self.diagnostics_window and self.diagnostics_window.winfo_exists():
+            self.diagnostics_window.lift()
+            return
+        self.diagnostics_window = tk.Toplevel(self.master)
+        self.diagnostics_window.title("Diagnostics")
+        self.diagnostics_text = tk.Text(self.diagnostics_window, width=90, height=40, font=("Courier", 10))
+        self.diagnostics_text.pack(fill="both", expand=True)
+        self.refresh_diagnostics()
+
+    def refresh_diagnostics(self):
+        """Redraw the diagnostics panel while it is open."""
+        if not (self.diagnostics_window and self.diagnostics_window.winfo_exists()):
+            return
+        self.diagnostics_text.delete("1.0", "end")
+        self.diagnostics_text.insert("1.0", self.diagnostics_report())
+        self.master.after(DIAGNOSTICS_INTERVAL, self.refresh_diagnostics)
+
+    def diagnostics_report(self):
+        """Build the text shown in the diagnostics panel."""
+        def ms(seconds):
+            return "-" if seconds is None else f"{seconds * 1000:.1f} ms"
+
+        lines = [
+            f"Polls in flight:        {metrics.POLLS_IN_FLIGHT.get()}",
+            f"Poll time p50/p99:      {ms(metrics.POLL_SECONDS.quantile(0.5))} / {ms(metrics.POLL_SECONDS.quantile(0.99))}",
+            f"Poll lag p99:           {ms(metrics.POLL_LAG_SECONDS.quantile(0.99))}",
+            f"XML parse p99:          {ms(metrics.CAMERA_PARSE_SECONDS.quantile(0.99))}",
+            f"Database flush p99:     {ms(metrics.DB_FLUSH_SECONDS.quantile(0.99))}",
+            f"Event log flush p99:    {ms(metrics.LOG_FLUSH_SECONDS.quantile(0.99))}",
+            f"Dashboard refresh p99:  {ms(metrics.DASHBOARD_UPDATE_SECONDS.quantile(0.99))}",
+            "",
+            "Queue depths:",
+        ]
+        for queue_name in ("poll_schedule", "dashboard", "database", "event_log"):
+            lines.append(f"  {queue_name:<20} {metrics.QUEUE_DEPTH.get(queue=queue_name)}")
+
+        errors = metrics.CAMERA_ERRORS.totals_by("camera")
+        rows = []
+        for camera in self.registry:
+            p99 = metrics.CAMERA_REQUEST_SECONDS.quantile(0.99, camera=camera.camera_id)
+            p50 = metrics.CAMERA_REQUEST_SECONDS.quantile(0.5, camera=camera.camera_id)
+            tile = self.camera_tiles.get(camera.camera_id)
+            rows.append((p99 or 0, camera, p50, p99, errors.get(camera.camera_id, 0), tile.health if tile else "-"))
+        rows.sort(key=lambda row: row[0], reverse=True)
+
+        lines += ["", f"Slowest cameras (of {len(rows)}):",
+                  f"  {'Camera':<10}{'IP':<22}{'Health':<10}{'p50':>12}{'p99':>12}{'Errors':>8}"]
+        for _, camera, p50, p99, error_count, health in rows[:DIAGNOSTICS_CAMERAS]:
+            number = self.registry.number(camera.camera_id) or "-"
+            lines.append(f"  {number:<10}{camera.ip:<22}{health:<10}{ms(p50):>12}{ms(p99):>12}{error_count:>8}")
+        return "\n".join(lines)
+
+    def set_zone_limit(self, zone_id):
+        """Prompt the user to change one zone's occupancy limit."""
+        state = self.zone_tiles[zone_id].state
+        new_limit = simpledialog.askinteger("Zone Limit", f"Enter the occupancy limit for {state.name} (0 for no limit):",
+                                            initialvalue=state.limit or 0, minvalue=0)
+        if new_limit is not None:
+            self.zones.set_limit(zone_id, new_limit)
+
+    def set_occupancy_limit(self):
+        """Prompt to set a new occupancy limit."""
+        new_limit = simpledialog.askinteger("Input", "Enter new occupancy limit:", parent=self.master)
+        if new_limit is not None:
+            self.occupancy_limit = new_limit
+            if self.occupancy_limit_label:
+                self.occupancy_limit_label.config(text=f"Occupancy Limit: {self.occupancy_limit}")
+
+def load_config_file():
+    """Prompt user to load a config file and return camera details from the config."""
+    config_file = filedialog.askopenfilename(filetypes=[("JSON files", "*.json")])
+    if not config_file:
+        return None, None
+    
+    config_data = load_config(config_file)
+    return cameras_from_config(config_data), config_data.get("zones")
+
+def get_camera_details():
+    root = tk.Tk()
+    root.withdraw()
+    
+    # Ask if user wants to use a config file
+    use_config = messagebox.askyesno("Config File", "Do you want to use a config file?")
+    
+    zones = None
+    if use_config:
+        cameras, zones = load_config_file()
+        if not cameras:
+            messagebox.showerror("Error", "Failed to load config file.")
+            return None, None, None
+    else:
+        num_cameras = simpledialog.askinteger("Input", "How many cameras are you using?")
+        cameras = []
+        
+        # Loop for the specified number of cameras
+        for i in range(num_cameras):
+            ip = simpledialog.askstring("Input", f"Enter IP for Camera {i + 1}:")
+            username = simpledialog.askstring("Input", f"Enter Username for Camera {i + 1}:")
+            password = simpledialog.askstring("Input", f"Enter Password for Camera {i + 1}:", show="*")
+            
+            if ip and username and password:
+                cameras.append(Camera(ip, username, password))
+            else:
+                messagebox.showerror("Error", f"Invalid details for Camera {i + 1}. Please try again.")
+                return None, None, None  # If any field is missing, exit without saving
+
+    occupancy_limit = simpledialog.askinteger("Input", "Enter total room occupancy limit (enter 0 for no limit)", parent=root)
+    
+    if not occupancy_limit:  # Allow user to skip entering an occupancy limit
+        occupancy_limit = None
+    
+    root.destroy()
+    return cameras, occupancy_limit, zones
+
+def run_dashboard(occupancy_limit, collector):
+    """Open the dashboard window for a collector and block until it is closed."""
+    root = tk.Tk()
+    root.title("People Counting Dashboard")
+    app = Dashboard(root, collector, occupancy_limit)
+    collector.start()
+
+    def on_close():
+        collector.stop()  # Flush queued database rows before exiting
+        root.destroy()
+
+    root.protocol("WM_DELETE_WINDOW", on_close)
+    root.mainloop()
+    return app
@@ -1,39 +1,385 @@
 import sqlite3
 import os
+import queue
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+import metrics
 
 DATABASE_FILE = 'people_counting.db'
+SCHEMA_VERSION = 2
+BATCH_SIZE = 500  # Flush once this many rows are waiting
+FLUSH_INTERVAL = 1.0  # Or once the oldest waiting row is this many seconds old
+RETRY_DELAY = 1.0  # Seconds before retrying rows after a transient error such as "database is locked"
+MAX_RETRY_ROWS = 100000  # Rows kept for retrying while the database is unavailable; older rows are dropped
 
-def create_database():
-    """Create a SQLite database and the 'logs' table."""
-    if not os.path.exists(DATABASE_FILE):
-        conn = sqlite3.connect(DATABASE_FILE)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-        CREATE TABLE logs (
-            timestamp TEXT,
-            camera_ip TEXT,
-            enter_count INTEGER,
-            exit_count INTEGER,
-            current_count INTEGER
-        )
+# Rollup table name -> bucket width in seconds
+ROLLUPS = {
+    'logs_minute': 60,
+    'logs_hour': 3600,
+}
+SITE_ID = '*'  # Reserved camera_id of the site-total series in the rollup tables
+SITE_CHUNK = 10000  # Log rows read at a time when rebuilding the site series
+
+# Queued by DatabaseWriter.remove_camera so a removed camera leaves the site total in order with its rows
+CameraRemoved = namedtuple("CameraRemoved", ["ts", "camera_id"])
+
+INSERT_LOG_SQL = '''
+INSERT INTO logs (ts, camera_id, camera_ip, enter_count, exit_count, current_count, entered, exited)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+UPSERT_ROLLUP_SQL = '''
+INSERT INTO {table} (camera_id, bucket, entered, exited, peak_count, samples)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (camera_id, bucket) DO UPDATE SET
+    entered = entered + excluded.entered,
+    exited = exited + excluded.exited,
+    peak_count = MAX(peak_count, excluded.peak_count),
+    samples = samples + excluded.samples
+'''
+
+def create_schema(conn):
+    """Create the time-series 'logs' table, its indexes and the rollup tables."""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS logs (
+        id INTEGER PRIMARY KEY,
+        ts REAL NOT NULL,
+        camera_id TEXT NOT NULL,
+        camera_ip TEXT,
+        enter_count INTEGER,
+        exit_count INTEGER,
+        current_count INTEGER,
+        entered INTEGER NOT NULL DEFAULT 0,
+        exited INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_logs_camera_ts ON logs (camera_id, ts)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_logs_ts ON logs (ts)')
+
+    for table in ROLLUPS:
+        conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            camera_id TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            entered INTEGER NOT NULL DEFAULT 0,
+            exited INTEGER NOT NULL DEFAULT 0,
+            peak_count INTEGER,
+            samples INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (camera_id, bucket)
+        ) WITHOUT ROWID
+        ''')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_bucket ON {table} (bucket)')
+
+def migrate_legacy_logs(conn, legacy_date):
+    """Carry rows from the original 'logs' table (HH:MM:SS text timestamps) into the new schema.
+
+    The old rows have no date, so they are all given legacy_date (the day the
+    database file was last written).
+    """
+    conn.execute('ALTER TABLE logs RENAME TO logs_v0')
+    create_schema(conn)
+    conn.execute('''
+    INSERT INTO logs (ts, camera_id, camera_ip, enter_count, exit_count, current_count, entered, exited)
+    SELECT
+        CAST(strftime('%s', ? || ' ' || timestamp, 'utc') AS REAL),
+        camera_ip,
+        camera_ip,
+        enter_count,
+        exit_count,
+        current_count,
+        MAX(enter_count - LAG(enter_count, 1, enter_count) OVER w, 0),
+        MAX(exit_count - LAG(exit_count, 1, exit_count) OVER w, 0)
+    FROM logs_v0
+    WINDOW w AS (PARTITION BY camera_ip ORDER BY rowid)
+    ORDER BY rowid
+    ''', (legacy_date,))
+    conn.execute('DROP TABLE logs_v0')
+
+    for table, width in ROLLUPS.items():
+        conn.execute(f'''
+        INSERT INTO {table} (camera_id, bucket, entered, exited, peak_count, samples)
+        SELECT camera_id, CAST(ts / {width} AS INTEGER) * {width}, SUM(entered), SUM(exited), MAX(current_count), COUNT(*)
+        FROM logs
+        GROUP BY 1, 2
         ''')
-        
+
+def migrate_database(conn, db_file=DATABASE_FILE):
+    """Bring the database schema up to SCHEMA_VERSION, migrating old files in place."""
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+
+    # Run the whole migration in one transaction so a failure leaves the old schema intact
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(logs)')]
+        if 'timestamp' in columns:
+            legacy_date = datetime.fromtimestamp(os.path.getmtime(db_file)).strftime('%Y-%m-%d')
+            print(f"Migrating {db_file} to schema version {SCHEMA_VERSION}...")
+            migrate_legacy_logs(conn, legacy_date)
+        else:
+            create_schema(conn)
+        if version < 2:
+            rebuild_site_rollups(conn)
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
         conn.commit()
-        conn.close()
-
-def insert_log(timestamp, camera_ip, enter_count, exit_count, current_count):
-    """Insert a new log entry into the database."""
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-    INSERT INTO logs (timestamp, camera_ip, enter_count, exit_count, current_count)
-    VALUES (?, ?, ?, ?, ?)
-    ''', (timestamp, camera_ip, enter_count, exit_count, current_count))
-    
-    conn.commit()
-    conn.close()
-
-# Initialize the database
-create_database()
\ No newline at end of file
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+def rollup_rows(rows, width):
+    """Pre-aggregate log rows into (camera_id, bucket) totals for one rollup table."""
+    buckets = {}
+    for ts, camera_id, _ip, _enter, _exit, current_count, entered, exited in rows:
+        key = (camera_id, int(ts // width) * width)
+        bucket = buckets.get(key)
+        if bucket is None:
+            buckets[key] = [entered, exited, current_count, 1]
+        else:
+            bucket[0] += entered
+            bucket[1] += exited
+            bucket[2] = max(bucket[2], current_count)
+            bucket[3] += 1
+    return [(camera_id, start, *totals) for (camera_id, start), totals in buckets.items()]
+
+def site_rows(items, latest):
+    """Turn log rows (and CameraRemoved markers) into rows of the site-total series.
+
+    Site occupancy is the sum of every camera's latest current_count. 'latest'
+    (camera_id -> current_count) is updated in place, carrying the sum across batches.
+    """
+    total = sum(latest.values())
+    rows = []
+    for item in items:
+        if isinstance(item, CameraRemoved):
+            total -= latest.pop(item.camera_id, 0)
+            rows.append((item.ts, SITE_ID, None, None, None, total, 0, 0))
+            continue
+        ts, camera_id, _ip, _enter, _exit, current_count, entered, exited = item
+        total += (current_count or 0) - latest.get(camera_id, 0)
+        latest[camera_id] = current_count or 0
+        rows.append((ts, SITE_ID, None, None, None, total, entered, exited))
+    return rows
+
+def write_rows(conn, rows, site=()):
+    """Insert log rows and update the rollup tables, plus any site-total rows, in the caller's transaction."""
+    conn.executemany(INSERT_LOG_SQL, rows)
+    for table, width in ROLLUPS.items():
+        conn.executemany(UPSERT_ROLLUP_SQL.format(table=table), rollup_rows(list(rows) + list(site), width))
+
+def rebuild_site_rollups(conn):
+    """Recompute the site-total series in the rollup tables from every logged row.
+
+    Camera removals aren't stored in the database, so a removed camera's last count
+    stays in the rebuilt total.
+    """
+    for table in ROLLUPS:
+        conn.execute(f'DELETE FROM {table} WHERE camera_id = ?', (SITE_ID,))
+    latest = {}
+    cursor = conn.execute('''
+    SELECT ts, camera_id, camera_ip, enter_count, exit_count, current_count, entered, exited
+    FROM logs
+    ORDER BY ts
+    ''')
+    while True:
+        rows = cursor.fetchmany(SITE_CHUNK)
+        if not rows:
+            break
+        site = site_rows(rows, latest)
+        for table, width in ROLLUPS.items():
+            conn.executemany(UPSERT_ROLLUP_SQL.format(table=table), rollup_rows(site, width))
+
+def latest_counts(conn, camera_ids):
+    """Return camera_id -> current_count from each camera's most recent logged row."""
+    latest = {}
+    for camera_id in camera_ids:
+        row = conn.execute('SELECT current_count FROM logs WHERE camera_id = ? ORDER BY ts DESC LIMIT 1',
+                           (camera_id,)).fetchone()
+        if row is not None and row[0] is not None:
+            latest[camera_id] = row[0]
+    return latest
+
+class DatabaseWriter:
+    """Write-behind log writer: rows are queued and flushed in batches by one thread.
+
+    Rows that fail with an operational error (database locked, busy or not openable)
+    are kept and retried. If the writer thread itself dies, the error is printed and
+    kept in 'failure', and insert_log drops (and counts) rows instead of queueing them.
+
+    The writer also keeps the site-total series (camera_id SITE_ID) in the rollup tables:
+    the sum of every camera's latest logged occupancy. When it connects, the sum is seeded
+    from the last logged row of each camera in 'cameras' (default: every camera in the logs).
+    """
+
+    def __init__(self, db_file=DATABASE_FILE, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, cameras=None):
+        self.db_file = db_file
+        self.cameras = cameras  # camera_ids seeding the site total, or None for every logged camera
+        self.site_latest = None  # camera_id -> latest current_count, loaded when the writer connects
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.thread = None
+        self.rows_written = 0
+        self.batches_written = 0
+        self.last_flush_seconds = 0.0
+        self.errors = 0
+        self.failure = None  # Exception that stopped the writer thread, if it died
+        self.rows_dropped = 0
+        self.conn = None  # Owned by the writer thread
+
+    def start(self):
+        """Start the writer thread, which owns the only connection to the database."""
+        if self.thread is None:
+            metrics.QUEUE_DEPTH.set_function(self.queue.qsize, queue="database")
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def insert_log(self, ts, camera_id, camera_ip, enter_count, exit_count, current_count, entered=0, exited=0):
+        """Queue a log entry; it is written on the next flush. Returns False if the writer has died."""
+        if self.failure is not None:
+            self.rows_dropped += 1
+            return False
+        self.queue.put((ts, camera_id, camera_ip, enter_count, exit_count, current_count, entered, exited))
+        return True
+
+    def remove_camera(self, camera_id, ts=None):
+        """Take a removed camera's occupancy out of the site total."""
+        if self.failure is None:
+            self.queue.put(CameraRemoved(ts if ts is not None else time.time(), camera_id))
+
+    def flush(self, timeout=None):
+        """Block until every row queued before this call has been committed."""
+        if self.thread is None or not self.thread.is_alive():
+            return False
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=None):
+        """Flush any waiting rows and stop the writer thread."""
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join(timeout)
+        self.thread = None
+
+    def stats(self):
+        """Return queue depth and throughput counters for the writer."""
+        return {
+            'queue_depth': self.queue.qsize(),
+            'rows_written': self.rows_written,
+            'batches_written': self.batches_written,
+            'last_flush_seconds': self.last_flush_seconds,
+            'errors': self.errors,
+            'rows_dropped': self.rows_dropped,
+            'failure': str(self.failure) if self.failure is not None else None,
+        }
+
+    def connect(self):
+        """Open the long-lived connection in WAL mode."""
+        conn = sqlite3.connect(self.db_file)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            migrate_database(conn, self.db_file)
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
+
+    def run(self):
+        """Write rows until closed, recording why if the thread dies."""
+        try:
+            self.write_loop()
+        except Exception as err:
+            self.failure = err
+            print(f"Database writer stopped, rows will no longer be saved: {err}")
+        finally:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    def write_loop(self):
+        """Collect rows until the batch is full or the flush interval passes, then write them."""
+        batch = []
+        waiters = []
+        deadline = None
+        retrying = False
+        running = True
+
+        while running:
+            timeout = None if deadline is None else max(0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False  # Flush interval passed
+
+            if item is None:
+                running = False
+            elif isinstance(item, threading.Event):
+                waiters.append(item)
+            elif item is not False:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if (len(batch) < self.batch_size or retrying) and time.monotonic() < deadline:
+                    continue
+
+            if not self.write_batch(batch):
+                if running:
+                    if len(batch) > MAX_RETRY_ROWS:
+                        print(f"Database unavailable, dropping {len(batch) - MAX_RETRY_ROWS} oldest rows")
+                        del batch[:len(batch) - MAX_RETRY_ROWS]
+                    retrying = True
+                    deadline = time.monotonic() + RETRY_DELAY
+                    continue  # Flush waiters keep waiting until the rows are written
+                print(f"Database unavailable at shutdown, {len(batch)} rows dropped")
+            batch = []
+            deadline = None
+            retrying = False
+            for waiter in waiters:
+                waiter.set()
+            waiters = []
+
+    def write_batch(self, batch):
+        """Insert a batch of rows and their rollups in a single transaction.
+
+        Returns False if the database was locked or unavailable and the batch should be retried.
+        """
+        if not batch:
+            return True
+        start = time.perf_counter()
+        try:
+            if self.conn is None:
+                conn = self.connect()
+                try:
+                    cameras = self.cameras
+                    if cameras is None:
+                        cameras = [row[0] for row in conn.execute('SELECT DISTINCT camera_id FROM logs')]
+                    self.site_latest = latest_counts(conn, cameras)
+                except sqlite3.Error:
+                    conn.close()
+                    raise
+                self.conn = conn
+            rows = [item for item in batch if not isinstance(item, CameraRemoved)]
+            latest = dict(self.site_latest)  # Only kept if the transaction commits
+            site = site_rows(batch, latest)
+            with self.conn:
+                write_rows(self.conn, rows, site)
+            self.site_latest = latest
+            self.rows_written += len(rows)
+            self.batches_written += 1
+            metrics.DB_ROWS_WRITTEN.inc(len(rows))
+        except sqlite3.OperationalError as db_err:
+            self.errors += 1
+            print(f"Database write error ({len(batch)} rows kept for retry): {db_err}")
+            return False
+        except sqlite3.Error as db_err:
+            self.errors += 1
+            print(f"Database write error ({len(batch)} rows dropped): {db_err}")
+        finally:
+            self.last_flush_seconds = time.perf_counter() - start
+            metrics.DB_FLUSH_SECONDS.observe(self.last_flush_seconds)
+        return True
@@ -0,0 +1,170 @@
+# eventlog.py
+
+import gzip
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+import metrics
+
+BATCH_SIZE = 200  # Write once this many lines are waiting
+FLUSH_INTERVAL = 1.0  # Or once the oldest waiting line is this many seconds old
+
+class EventLogSink:
+    """Buffered daily text log: lines are queued and written in batches by one thread.
+
+    Each line is written to the file for the day it was logged (logs/log_YYYY-MM-DD.txt),
+    so the log rolls over at midnight without losing lines. The log never moves back to
+    an earlier day: a line from before midnight that arrives after the rollover (polls
+    finish out of order) goes in the new day's file.
+    """
+
+    def __init__(self, log_dir="logs", header=None, compress_old=False,
+                 batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.log_dir = log_dir
+        self.header = header  # Callable returning the text written whenever a file is opened
+        self.compress_old = compress_old
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.thread = None
+        self.file = None
+        self.current_day = None
+        self.current_log_file = None
+        self.lines_written = 0
+        self.last_flush_seconds = 0.0
+
+    def log_path(self, day):
+        """Return the log file path for a YYYY-MM-DD day."""
+        return os.path.join(self.log_dir, f"log_{day}.txt")
+
+    def start(self):
+        """Open today's log and start the writer thread."""
+        if self.thread is not None:
+            return
+        if not os.path.exists(self.log_dir):
+            os.makedirs(self.log_dir)
+        self.open_day(datetime.now().strftime("%Y-%m-%d"))
+        if self.compress_old:
+            self.compress_previous_days()
+        metrics.QUEUE_DEPTH.set_function(self.queue.qsize, queue="event_log")
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def write(self, line, when=None):
+        """Queue a line; 'when' (epoch seconds, default now) decides which day's file it goes in."""
+        self.queue.put((when if when is not None else time.time(), line))
+
+    def flush(self, timeout=None):
+        """Block until every line queued before this call has been written."""
+        if self.thread is None or not self.thread.is_alive():
+            return False
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=None):
+        """Write any waiting lines, stop the writer thread and close the file."""
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join(timeout)
+        self.thread = None
+
+    def stats(self):
+        """Return queue depth and throughput counters for the sink."""
+        return {
+            'queue_depth': self.queue.qsize(),
+            'lines_written': self.lines_written,
+            'last_flush_seconds': self.last_flush_seconds,
+        }
+
+    def open_day(self, day):
+        """Switch to the log file for a day, appending so restarts never truncate it."""
+        if self.file is not None:
+            self.file.close()
+        self.current_day = day
+        self.current_log_file = self.log_path(day)
+        self.file = open(self.current_log_file, "a")
+        if self.header is not None:
+            self.file.write(self.header())
+            self.file.flush()
+
+    def compress_previous_days(self):
+        """Gzip every uncompressed log file except the one currently open."""
+        for name in os.listdir(self.log_dir):
+            path = os.path.join(self.log_dir, name)
+            if name.startswith("log_") and name.endswith(".txt") and path != self.current_log_file:
+                self.compress_file(path)
+
+    def compress_file(self, path):
+        """Replace a finished log file with a gzipped copy, appended to any existing archive for the day."""
+        try:
+            with open(path, "rb") as src, gzip.open(path + ".gz", "ab") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(path)
+        except OSError as err:
+            print(f"Failed to compress log file {path}: {err}")
+
+    def run(self):
+        """Collect lines until the batch is full or the flush interval passes, then write them."""
+        batch = []
+        waiters = []
+        deadline = None
+        running = True
+
+        while running:
+            timeout = None if deadline is None else max(0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False  # Flush interval passed
+
+            if item is None:
+                running = False
+            elif isinstance(item, threading.Event):
+                waiters.append(item)
+            elif item is not False:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(batch) < self.batch_size:
+                    continue
+
+            self.write_batch(batch)
+            batch = []
+            deadline = None
+            for waiter in waiters:
+                waiter.set()
+            waiters = []
+
+        self.file.close()
+        self.file = None
+
+    def write_batch(self, batch):
+        """Write a batch of lines, rotating to a new file when a later day starts."""
+        if not batch:
+            return
+        start = time.perf_counter()
+        pending = []
+        try:
+            for when, line in batch:
+                day = datetime.fromtimestamp(when).strftime("%Y-%m-%d")
+                if day > self.current_day:
+                    self.file.write("".join(pending))
+                    pending = []
+                    finished = self.current_log_file
+                    self.open_day(day)
+                    if self.compress_old:
+                        self.compress_file(finished)
+                pending.append(line)
+            self.file.write("".join(pending))
+            self.file.flush()
+            self.lines_written += len(batch)
+            metrics.LOG_LINES_WRITTEN.inc(len(batch))
+        except OSError as err:
+            print(f"Event log write error: {err}")
+        self.last_flush_seconds = time.perf_counter() - start
+        metrics.LOG_FLUSH_SECONDS.observe(self.last_flush_seconds)
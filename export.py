@@ -0,0 +1,159 @@
+# export.py
+
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from database import DATABASE_FILE, SITE_ID
+
+EXPORT_CHUNK = 5000  # Rows fetched from SQLite and written out at a time
+
+# Report name -> (column names, query). Each query takes :start, :end and :site, filters
+# cameras with a {cameras} placeholder (except the site-wide report), and reads only what
+# the report needs.
+REPORTS = {
+    'events': (
+        ["time", "camera_id", "camera_ip", "entered", "exited", "enter_count", "exit_count", "current_count"],
+        '''
+        SELECT datetime(ts, 'unixepoch', 'localtime'), camera_id, camera_ip, entered, exited,
+               enter_count, exit_count, current_count
+        FROM logs
+        WHERE ts >= :start AND ts < :end {cameras}
+        ORDER BY ts
+        ''',
+    ),
+    'hourly': (
+        ["hour", "camera_id", "entered", "exited", "peak_count"],
+        '''
+        SELECT datetime(bucket, 'unixepoch', 'localtime'), camera_id, entered, exited, peak_count
+        FROM logs_hour
+        WHERE bucket >= :start AND bucket < :end AND camera_id != :site {cameras}
+        ORDER BY bucket, camera_id
+        ''',
+    ),
+    'hourly-peaks': (
+        # Read from the site-total series, so peak_count is the whole site's peak occupancy
+        ["hour", "entered", "exited", "peak_count"],
+        '''
+        SELECT datetime(bucket, 'unixepoch', 'localtime'), entered, exited, peak_count
+        FROM logs_hour
+        WHERE camera_id = :site AND bucket >= :start AND bucket < :end
+        ORDER BY bucket
+        ''',
+    ),
+    'daily': (
+        ["day", "camera_id", "entered", "exited", "peak_count"],
+        '''
+        SELECT date(bucket, 'unixepoch', 'localtime'), camera_id, SUM(entered), SUM(exited), MAX(peak_count)
+        FROM logs_hour
+        WHERE bucket >= :start AND bucket < :end AND camera_id != :site {cameras}
+        GROUP BY 1, camera_id
+        ORDER BY 1, camera_id
+        ''',
+    ),
+}
+
+def parse_time(text, end=False):
+    """Parse 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM' (local time) into epoch seconds.
+
+    A bare date used as an end time means the end of that day.
+    """
+    if not text:
+        return None
+    when = datetime.fromisoformat(text)
+    if end and len(text) == 10:
+        when += timedelta(days=1)
+    return when.timestamp()
+
+def build_query(report, start=None, end=None, cameras=None):
+    """Return (columns, SQL, parameters) for a report with optional time and camera filters."""
+    columns, sql = REPORTS[report]
+    params = {'start': start if start is not None else float('-inf'),
+              'end': end if end is not None else float('inf'),
+              'site': SITE_ID}
+    camera_filter = ""
+    if cameras:
+        names = [f":camera{i}" for i in range(len(cameras))]
+        camera_filter = f"AND camera_id IN ({', '.join(names)})"
+        params.update({f"camera{i}": camera_id for i, camera_id in enumerate(cameras)})
+    return columns, sql.format(cameras=camera_filter), params
+
+def stream_rows(db_file, report, start=None, end=None, cameras=None, chunk_size=EXPORT_CHUNK):
+    """Yield (columns, rows) chunks of a report, reading at most chunk_size rows at a time."""
+    columns, sql, params = build_query(report, start, end, cameras)
+    conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)  # Never blocks the writer
+    try:
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield columns, rows
+    finally:
+        conn.close()
+
+def export_report(out, report="events", fmt="csv", db_file=DATABASE_FILE, start=None, end=None, cameras=None,
+                  chunk_size=EXPORT_CHUNK):
+    """Write a report to an open text file as CSV or JSON Lines and return the number of rows."""
+    columns = REPORTS[report][0]
+    writer = None
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(columns)
+
+    count = 0
+    for columns, rows in stream_rows(db_file, report, start, end, cameras, chunk_size):
+        if writer:
+            writer.writerows(rows)
+        else:
+            out.write("".join(json.dumps(dict(zip(columns, row))) + "\n" for row in rows))
+        count += len(rows)
+    return count
+
+def export_to_file(path, report="events", fmt=None, **filters):
+    """Export a report to a file, choosing the format from its extension unless fmt is given."""
+    fmt = fmt or ("jsonl" if path.endswith((".jsonl", ".json")) else "csv")
+    with open(path, "w", newline="") as out:
+        return export_report(out, report, fmt, **filters)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export people counting history from the database")
+    parser.add_argument("report", nargs="?", default="events", choices=sorted(REPORTS),
+                        help="What to export (default: events)")
+    parser.add_argument("-o", "--output", help="File to write (default: standard output)")
+    parser.add_argument("--format", choices=["csv", "jsonl"],
+                        help="Output format (default: from the file extension, or csv)")
+    parser.add_argument("--since", help="Start date/time, e.g. 2024-05-01 or '2024-05-01 08:00'")
+    parser.add_argument("--until", help="End date/time; a bare date includes that whole day")
+    parser.add_argument("--camera", action="append", help="Only this camera id (may be repeated)")
+    parser.add_argument("--db", default=DATABASE_FILE, help=f"Database file (default: {DATABASE_FILE})")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        filters = {
+            'db_file': args.db,
+            'start': parse_time(args.since),
+            'end': parse_time(args.until, end=True),
+            'cameras': args.camera,
+        }
+    except ValueError as err:
+        print(f"Invalid date: {err}")
+        return 1
+
+    try:
+        if args.output:
+            count = export_to_file(args.output, args.report, args.format, **filters)
+            print(f"Exported {count} rows to {args.output}")
+        else:
+            export_report(sys.stdout, args.report, args.format or "csv", **filters)
+    except sqlite3.Error as err:
+        print(f"Could not read {args.db}: {err}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
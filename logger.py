@@ -1,82 +1,138 @@
 # logger.py
 
-import os
-import time
-from datetime import datetime
 import threading
-from database import insert_log
+from datetime import datetime
+from database import DatabaseWriter
+from eventlog import EventLogSink
+from registry import CAMERA_ADDED, CAMERA_REMOVED
 
 class Logger:
-    def __init__(self, cameras, log_dir="logs"):
-        self.cameras = cameras  # Reference, don't modify
+    def __init__(self, registry, engine, log_dir="logs", compress_old_logs=False):
+        self.registry = registry  # Reference, don't modify
+        self.engine = engine
         self.log_dir = log_dir
-        self.current_log_file = None
-        self.create_log_file()
-        self.last_counts = [{'in': 0, 'out': 0} for _ in self.cameras]
-        self.logging_threads = []
-
-        for camera in cameras:
-            self.start_logging(camera)
-
-    def create_log_file(self):
-        if not os.path.exists(self.log_dir):
-            os.makedirs(self.log_dir)
-
-        today = datetime.now().strftime("%Y-%m-%d")
-        log_filename = os.path.join(self.log_dir, f"log_{today}.txt")
-        self.current_log_file = log_filename
-
-        with open(self.current_log_file, "w") as f:
-            f.write("--CAMERAS--\n")
-            for i, camera in enumerate(self.cameras):
-                f.write(f"Camera {i + 1} = {camera.ip}\n")
-            f.write("\n--EVENTS--\n")
-
-    def start_logging(self, camera):
-        """Start a logging thread for a new camera."""
-        thread = threading.Thread(target=self.log_camera_data, args=(camera,), daemon=True)
-        thread.start()
-        self.logging_threads.append(thread)
-
-    def log_camera_data(self, camera):
-        """Log the data for a specific camera."""
-        while True:
-            current_time = datetime.now().strftime("%H:%M:%S")
-            entered, exited, currently_in = camera.get_counts()
-
-            camera_index = self.cameras.index(camera)
-
-            if entered > self.last_counts[camera_index]['in']:
-                log_entry = f"{current_time}, Camera {camera_index + 1}, person entered (Occupancy: {currently_in})\n"
-                self.append_to_events_log(log_entry)
-                insert_log(current_time, camera.ip, entered, self.last_counts[camera_index]['out'], currently_in)
-
-            if exited > self.last_counts[camera_index]['out']:
-                log_entry = f"{current_time}, Camera {camera_index + 1}, person exited (Occupancy: {currently_in})\n"
-                self.append_to_events_log(log_entry)
-                insert_log(current_time, camera.ip, self.last_counts[camera_index]['in'], exited, currently_in)
-
-            self.last_counts[camera_index] = {'in': entered, 'out': exited}
-
-            time.sleep(1)
 
-    def append_to_events_log(self, entry):
+        # Lines are buffered and written by the event log thread, which also rotates files at midnight
+        self.events_log = EventLogSink(log_dir, header=self.log_header, compress_old=compress_old_logs)
+        self.events_log.start()
+
+        # Zones currently over their limit, so alerts are logged once when they start and end
+        self.zones_over_limit = set()
+
+        # Last logged counts per camera_id; None means the next good reading becomes the baseline
+        # Every camera starts that way, so counts from before this run are never logged as new events
+        self.last_counts = {camera.camera_id: None for camera in self.registry}
+        self.lock = threading.Lock()
+
+        # Rows are queued and written in batches by the database writer thread
+        self.db_writer = DatabaseWriter(cameras=[camera.camera_id for camera in self.registry])
+        self.db_writer.start()
+
+        # Counts come from the shared polling engine instead of polling each camera here
+        self.engine.subscribe(self.log_camera_data)
+        self.registry.subscribe(self.on_registry_event)
+
+    @property
+    def current_log_file(self):
+        """Path of the log file currently being written."""
+        return self.events_log.current_log_file
+
+    def log_header(self):
+        """Return the camera list written at the top of each log file (and again after a restart)."""
+        lines = ["--CAMERAS--\n"]
+        for camera in self.registry:
+            lines.append(f"Camera {self.registry.number(camera.camera_id)} = {camera.ip}\n")
+        lines.append("\n--EVENTS--\n")
+        return "".join(lines)
+
+    def on_registry_event(self, event, camera):
+        """Start or stop the log stream for a camera added to or removed from the registry."""
+        if event == CAMERA_ADDED:
+            self.add_camera_to_log(camera)
+        elif event == CAMERA_REMOVED:
+            self.remove_camera_from_log(camera)
+
+    def log_camera_data(self, snapshot):
+        """Log the data from a camera snapshot published by the polling engine."""
+        if snapshot.error:
+            return  # Failed polls carry stale counts and must not produce events
+
+        camera = snapshot.camera
+        number = self.registry.number(camera.camera_id)
+        with self.lock:
+            if camera.camera_id not in self.last_counts or number is None:
+                return  # Camera was removed
+            last = self.last_counts[camera.camera_id]
+            self.last_counts[camera.camera_id] = {'in': snapshot.entered, 'out': snapshot.exited}
+        if last is None:
+            return  # First reading after a reset only sets the baseline
+
+        current_time = datetime.fromtimestamp(snapshot.timestamp).strftime("%H:%M:%S")
+        entered, exited, currently_in = snapshot.entered, snapshot.exited, snapshot.currently_in
+
+        if entered > last['in']:
+            log_entry = f"{current_time}, Camera {number}, person entered (Occupancy: {currently_in})\n"
+            self.append_to_events_log(log_entry, snapshot.timestamp)
+            self.db_writer.insert_log(snapshot.timestamp, camera.camera_id, camera.ip, entered, last['out'], currently_in,
+                                      entered=entered - last['in'])
+
+        if exited > last['out']:
+            log_entry = f"{current_time}, Camera {number}, person exited (Occupancy: {currently_in})\n"
+            self.append_to_events_log(log_entry, snapshot.timestamp)
+            self.db_writer.insert_log(snapshot.timestamp, camera.camera_id, camera.ip, last['in'], exited, currently_in,
+                                      exited=exited - last['out'])
+
+    def rebaseline(self, camera_ids):
+        """Take the next good reading of each camera as its baseline instead of logging the change.
+
+        Used around count resets so the drop to zero isn't logged as exits (or a late
+        pre-reset reading as entries).
+        """
+        with self.lock:
+            for camera_id in camera_ids:
+                if camera_id in self.last_counts:
+                    self.last_counts[camera_id] = None
+
+    def log_zone_state(self, state):
+        """Log a zone going over or coming back under its limit."""
+        with self.lock:
+            if state.over_limit == (state.zone_id in self.zones_over_limit):
+                return
+            if state.over_limit:
+                self.zones_over_limit.add(state.zone_id)
+            else:
+                self.zones_over_limit.discard(state.zone_id)
+        current_time = datetime.now().strftime("%H:%M:%S")
+        status = "over limit" if state.over_limit else "back under limit"
+        self.append_to_events_log(f"{current_time}, Zone {state.name} {status} (Occupancy: {state.occupancy}/{state.limit})\n")
+
+    def append_to_events_log(self, entry, when=None):
         """Append an entry to the events log section."""
-        with open(self.current_log_file, "a") as f:
-            f.write(entry)
+        self.events_log.write(entry, when)
 
     def add_camera_to_log(self, camera):
-        """Reference the camera but don't append it to self.cameras here!"""
-        # Start logging for the new camera
-        self.last_counts.append({'in': 0, 'out': 0})  # Initialize last counts for the new camera
+        """Start logging a camera that was added to the registry."""
+        with self.lock:
+            self.last_counts[camera.camera_id] = None  # Its first reading becomes the baseline
 
         # Append new camera details to the log file
-        with open(self.current_log_file, "a") as f:
-            f.write(f"Camera {len(self.last_counts)} = {camera.ip}\n")  # Update log with the new camera
-        
-        self.start_logging(camera)
-
-def start_logging(cameras):
-    """Initialize and start logging for the provided cameras."""
-    logger = Logger(cameras)
+        self.events_log.write(f"Camera {self.registry.number(camera.camera_id)} = {camera.ip}\n")
+
+    def remove_camera_from_log(self, camera):
+        """Stop logging a camera that was removed from the registry."""
+        with self.lock:
+            self.last_counts.pop(camera.camera_id, None)
+        self.db_writer.remove_camera(camera.camera_id)
+        self.events_log.write(f"Camera {self.registry.number(camera.camera_id)} = {camera.ip} removed\n")
+
+    def close(self):
+        """Stop receiving snapshots and flush any rows and lines still waiting to be written."""
+        self.engine.unsubscribe(self.log_camera_data)
+        self.registry.unsubscribe(self.on_registry_event)
+        self.db_writer.close()
+        self.events_log.close()
+
+def start_logging(registry, engine, compress_old_logs=False):
+    """Initialize logging for the registered cameras from the shared polling engine."""
+    logger = Logger(registry, engine, compress_old_logs=compress_old_logs)
     return logger
\ No newline at end of file
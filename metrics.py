@@ -0,0 +1,284 @@
+# metrics.py
+
+import bisect
+import os
+import threading
+import time
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+def label_key(labels):
+    """Turn keyword labels into a hashable, consistently ordered key."""
+    return tuple(sorted(labels.items()))
+
+def format_labels(key):
+    """Format a label key in Prometheus text syntax, e.g. {camera="a",le="0.5"}."""
+    if not key:
+        return ""
+    escape = lambda value: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in key) + "}"
+
+class Counter:
+    """Monotonically increasing count, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """Add to the count for a set of labels."""
+        key = label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        """Return the current count for a set of labels."""
+        return self.values.get(label_key(labels), 0)
+
+    def totals_by(self, label):
+        """Return counts summed over every other label, keyed by the value of one label."""
+        totals = {}
+        with self.lock:
+            for key, value in self.values.items():
+                name = dict(key).get(label)
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+    def drain(self):
+        """Return the counts recorded so far and start again from zero (see merge)."""
+        with self.lock:
+            values, self.values = self.values, {}
+        return values
+
+    def merge(self, values):
+        """Add counts drained from another process's copy of this counter."""
+        with self.lock:
+            for key, value in values.items():
+                self.values[key] = self.values.get(key, 0) + value
+
+    def samples(self):
+        """Return (name, label key, value) rows for export."""
+        with self.lock:
+            items = list(self.values.items())
+        return [(self.name, key, value) for key, value in items]
+
+class Gauge:
+    """Value that goes up and down. A function can be attached to read it at export time."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+        self.functions = {}
+        self.lock = threading.Lock()
+
+    def set(self, value, **labels):
+        """Set the value for a set of labels."""
+        with self.lock:
+            self.values[label_key(labels)] = value
+
+    def set_function(self, function, **labels):
+        """Read the gauge by calling function() whenever metrics are exported."""
+        with self.lock:
+            self.functions[label_key(labels)] = function
+
+    def remove(self, **labels):
+        """Forget a labelled value, e.g. for a camera that was removed."""
+        key = label_key(labels)
+        with self.lock:
+            self.values.pop(key, None)
+            self.functions.pop(key, None)
+
+    def get(self, **labels):
+        """Return the current value for a set of labels."""
+        key = label_key(labels)
+        function = self.functions.get(key)
+        return function() if function else self.values.get(key, 0)
+
+    def samples(self):
+        """Return (name, label key, value) rows for export."""
+        with self.lock:
+            items = list(self.values.items())
+            functions = list(self.functions.items())
+        samples = [(self.name, key, value) for key, value in items]
+        for key, function in functions:
+            try:
+                samples.append((self.name, key, function()))
+            except Exception:
+                pass
+        return samples
+
+class Histogram:
+    """Distribution of observed values in cumulative buckets, optionally split by labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.series = {}  # label key -> [bucket counts..., +Inf count, sum]
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """Record one value for a set of labels."""
+        key = label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, **labels):
+        """Context manager that observes the time spent in its block."""
+        return Timer(self, labels)
+
+    def count(self, **labels):
+        """Return how many values were observed for a set of labels."""
+        series = self.series.get(label_key(labels))
+        return sum(series[:-1]) if series else 0
+
+    def quantile(self, q, **labels):
+        """Estimate a quantile by linear interpolation within buckets, or None without data."""
+        with self.lock:
+            series = self.series.get(label_key(labels))
+            series = list(series) if series else None
+        if not series:
+            return None
+        counts = series[:-1]
+        total = sum(counts)
+        if total == 0:
+            return None
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0
+                if i >= len(self.buckets):
+                    return lower  # Above the largest bucket
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def label_keys(self):
+        """Return the label keys that have observations."""
+        with self.lock:
+            return list(self.series)
+
+    def drain(self):
+        """Return the observations recorded so far and start again from none (see merge)."""
+        with self.lock:
+            series, self.series = self.series, {}
+        return series
+
+    def merge(self, series):
+        """Add observations drained from another process's copy of this histogram."""
+        with self.lock:
+            for key, counts in series.items():
+                current = self.series.get(key)
+                if current is None:
+                    self.series[key] = list(counts)
+                else:
+                    self.series[key] = [a + b for a, b in zip(current, counts)]
+
+    def samples(self):
+        """Return (name, label key, value) rows for export."""
+        with self.lock:
+            items = [(key, list(series)) for key, series in self.series.items()]
+        samples = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", key + (("le", repr(float(bound))),), cumulative))
+            cumulative += series[len(self.buckets)]
+            samples.append((f"{self.name}_bucket", key + (("le", "+Inf"),), cumulative))
+            samples.append((f"{self.name}_count", key, cumulative))
+            samples.append((f"{self.name}_sum", key, series[-1]))
+        return samples
+
+class Timer:
+    """Context manager returned by Histogram.time()."""
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+class MetricsRegistry:
+    """Collection of metrics that can be rendered in Prometheus text format."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        """Add a metric to the registry and return it."""
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text):
+        return self.register(Counter(name, help_text))
+
+    def gauge(self, name, help_text):
+        return self.register(Gauge(name, help_text))
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help_text, buckets))
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, key, value in metric.samples():
+                lines.append(f"{name}{format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """Write the current metrics to a file, replacing it atomically."""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(self.render())
+        os.replace(temp_path, path)
+
+REGISTRY = MetricsRegistry()
+
+# Camera requests
+CAMERA_REQUEST_SECONDS = REGISTRY.histogram("camera_request_seconds", "Time taken by camera HTTP requests.")
+CAMERA_ERRORS = REGISTRY.counter("camera_errors_total", "Failed camera requests by kind (http, timeout, connection, request, parse).")
+CAMERA_PARSE_SECONDS = REGISTRY.histogram("camera_parse_seconds", "Time taken to parse a camera's XML response.")
+
+# Polling engine
+POLL_SECONDS = REGISTRY.histogram("poll_seconds", "Time taken to poll a camera and publish its snapshot.")
+POLL_LAG_SECONDS = REGISTRY.histogram("poll_lag_seconds", "How late polls start after they were due.")
+POLLS_IN_FLIGHT = REGISTRY.gauge("polls_in_flight", "Camera polls currently running.")
+CAMERA_HEALTH = REGISTRY.gauge("camera_healthy", "1 if a camera is healthy, 0.5 if degraded, 0 if offline.")
+OCCUPANCY_TOTAL = REGISTRY.gauge("occupancy_total", "People currently inside, summed over every camera.")
+SHARD_WORKERS_ALIVE = REGISTRY.gauge("shard_workers_alive", "Shard processes running (sharded collector only).")
+
+# Writers and queues
+QUEUE_DEPTH = REGISTRY.gauge("queue_depth", "Items waiting in an internal queue.")
+DB_FLUSH_SECONDS = REGISTRY.histogram("db_flush_seconds", "Time taken to write a batch of rows to SQLite.")
+DB_ROWS_WRITTEN = REGISTRY.counter("db_rows_written_total", "Rows written to the logs table.")
+LOG_FLUSH_SECONDS = REGISTRY.histogram("event_log_flush_seconds", "Time taken to write a batch of lines to the text log.")
+LOG_LINES_WRITTEN = REGISTRY.counter("event_log_lines_written_total", "Lines written to the text event log.")
+
+# Dashboard
+DASHBOARD_UPDATE_SECONDS = REGISTRY.histogram("dashboard_update_seconds", "Time taken by each dashboard refresh on the Tk thread.")
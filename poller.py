@@ -0,0 +1,227 @@
+# poller.py
+
+import heapq
+import itertools
+import time
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+from registry import CAMERA_ADDED, CAMERA_REMOVED
+from scheduler import DEGRADED, HEALTHY, PollSchedule
+
+POLL_INTERVAL = 2  # Default seconds between polls for cameras without their own interval
+POLL_WORKERS = 16  # Maximum number of cameras polled at the same time
+PROBE_WORKERS = 64  # Cameras probed at the same time when polling starts
+
+# Immutable view of a camera's counts at the time it was polled.
+# 'error' is None for a good reading; on failure the last good counts are kept.
+# 'health' is healthy, degraded or offline (see scheduler.py).
+CameraSnapshot = namedtuple("CameraSnapshot", ["camera", "entered", "exited", "currently_in", "timestamp", "error", "health"])
+
+class SnapshotPublisher:
+    """Latest snapshot per camera and the subscribers they are sent to, shared by the polling engines."""
+
+    def __init__(self):
+        self.snapshots = {}  # camera_id -> latest CameraSnapshot
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.restored = []  # Snapshots from the previous run, published when polling starts
+
+    def subscribe(self, callback):
+        """Register a callback that receives every new CameraSnapshot.
+
+        Callbacks are called from the engine's polling threads and must be thread-safe.
+        """
+        with self.lock:
+            self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """Stop sending snapshots to a callback."""
+        with self.lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def get_snapshot(self, camera_id):
+        """Return the latest snapshot for a camera, or None if it hasn't been polled yet."""
+        return self.snapshots.get(camera_id)
+
+    def restore(self, snapshots):
+        """Seed the latest snapshots from a previous run so consumers have counts before the first poll."""
+        for snapshot in snapshots:
+            self.snapshots[snapshot.camera.camera_id] = snapshot
+        self.restored = list(snapshots)
+
+    def publish_restored(self):
+        """Publish restored snapshots that no poll has replaced yet. Called when polling starts."""
+        for snapshot in self.restored:
+            if self.snapshots.get(snapshot.camera.camera_id) is snapshot:
+                self.publish(snapshot)
+        self.restored = []
+
+    def publish(self, snapshot):
+        """Send a snapshot to every subscriber."""
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for callback in subscribers:
+            try:
+                callback(snapshot)
+            except Exception as err:
+                print(f"Snapshot subscriber error: {err}")
+
+class PollingEngine(SnapshotPublisher):
+    def __init__(self, registry, interval=POLL_INTERVAL, max_workers=POLL_WORKERS):
+        super().__init__()
+        self.registry = registry  # Reference, don't modify
+        self.interval = interval
+        self.max_workers = max_workers
+        self.schedules = {}  # camera_id -> PollSchedule
+        self.due = []  # Heap of (due time, tie breaker, camera_id, PollSchedule)
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.executor = None
+        self.running = False
+        self.thread = None
+        self.in_flight = 0
+
+        metrics.POLLS_IN_FLIGHT.set_function(lambda: self.in_flight)
+        metrics.QUEUE_DEPTH.set_function(lambda: len(self.due), queue="poll_schedule")
+
+        # Start and stop polling cameras as they are added to or removed from the registry
+        for camera in self.registry:
+            self.add_camera(camera)
+        self.registry.subscribe(self.on_registry_event)
+
+    def total_occupancy(self):
+        """Sum current occupancy over the latest snapshots."""
+        return sum(snapshot.currently_in for snapshot in list(self.snapshots.values()))
+
+    def start(self):
+        """Start polling in a background thread."""
+        if self.running:
+            return
+        self.running = True
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="poller")
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def probe(self):
+        """Poll every camera waiting for its first poll at once, before steady-state polling.
+
+        Unreachable cameras time out together instead of holding up the poll workers one after
+        another, and come out of the probe already backing off.
+        """
+        with self.condition:
+            due, self.due = self.due, []
+        polls = [(self.registry.get(camera_id), schedule) for _, _, camera_id, schedule in due
+                 if self.schedules.get(camera_id) is schedule]
+        polls = [(camera, schedule) for camera, schedule in polls if camera is not None]
+        if not polls:
+            return
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=min(PROBE_WORKERS, len(polls)), thread_name_prefix="probe") as executor:
+            snapshots = list(executor.map(lambda poll: self.poll_camera(*poll), polls))
+        reachable = sum(1 for snapshot in snapshots if snapshot is not None and snapshot.error is None)
+        print(f"Probed {len(polls)} camera(s) in {time.monotonic() - started:.1f}s, {reachable} reachable")
+
+    def stop(self):
+        """Stop polling; polls already in flight are not waited for."""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.executor:
+            self.executor.shutdown(wait=False)  # Queued polls see running is False and return at once
+
+    def on_registry_event(self, event, camera):
+        """Start polling added cameras and stop polling removed ones."""
+        if event == CAMERA_ADDED:
+            self.add_camera(camera)
+        elif event == CAMERA_REMOVED:
+            self.remove_camera(camera)
+
+    def add_camera(self, camera):
+        """Schedule a camera to be polled straight away."""
+        with self.condition:
+            schedule = self.schedules[camera.camera_id] = PollSchedule(camera.interval or self.interval)
+            heapq.heappush(self.due, (time.monotonic(), next(self.counter), camera.camera_id, schedule))
+            self.condition.notify()
+
+    def remove_camera(self, camera):
+        """Stop polling a camera; a poll already in flight is discarded."""
+        with self.condition:
+            self.schedules.pop(camera.camera_id, None)
+            self.snapshots.pop(camera.camera_id, None)
+        metrics.CAMERA_HEALTH.remove(camera=camera.camera_id)
+
+    def run(self):
+        """Poll each camera when it is due and reschedule it from the result."""
+        self.publish_restored()
+        self.probe()
+
+        with self.condition:
+            while self.running:
+                now = time.monotonic()
+                while self.due and self.due[0][0] <= now:
+                    due_time, _, camera_id, schedule = heapq.heappop(self.due)
+                    camera = self.registry.get(camera_id)
+                    if camera is None or self.schedules.get(camera_id) is not schedule:
+                        continue  # Removed (or removed and re-added) while waiting
+                    metrics.POLL_LAG_SECONDS.observe(now - due_time)
+                    try:
+                        self.executor.submit(self.poll_camera, camera, schedule)
+                    except RuntimeError:
+                        return  # Executor was shut down by stop()
+
+                timeout = max(0, self.due[0][0] - now) if self.due else None
+                self.condition.wait(timeout)
+
+    def reschedule(self, camera, schedule, delay):
+        """Queue a camera's next poll unless it has been removed (or removed and re-added) meanwhile."""
+        with self.condition:
+            if self.schedules.get(camera.camera_id) is schedule:
+                heapq.heappush(self.due, (time.monotonic() + delay, next(self.counter), camera.camera_id, schedule))
+                self.condition.notify()
+
+    def poll_camera(self, camera, schedule):
+        """Poll a single camera, publish its new snapshot and schedule the next poll."""
+        if not self.running:
+            return None  # Queued before stop()
+        with self.lock:
+            self.in_flight += 1
+        try:
+            with metrics.POLL_SECONDS.time():
+                return self.poll_and_publish(camera, schedule)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def poll_and_publish(self, camera, schedule):
+        """Read a camera's counts, update its schedule and publish the snapshot."""
+
+        counts = None
+        try:
+            counts = camera.get_counts()
+        except Exception as err:
+            print(f"Polling error for camera at {camera.ip}: {err}")
+
+        if counts is None:
+            delay = schedule.record_failure()
+            previous = self.snapshots.get(camera.camera_id)
+            if previous is not None:
+                entered, exited, currently_in = previous.entered, previous.exited, previous.currently_in
+            else:
+                entered, exited, currently_in = 0, 0, 0
+            snapshot = CameraSnapshot(camera, entered, exited, currently_in, time.time(), "Camera did not respond", schedule.health)
+        else:
+            delay = schedule.record_success(counts)
+            entered, exited, currently_in = counts
+            snapshot = CameraSnapshot(camera, entered, exited, currently_in, time.time(), None, schedule.health)
+
+        with self.condition:  # Same lock as remove_camera, so a removed camera's snapshot can't be stored after it
+            if self.schedules.get(camera.camera_id) is not schedule:
+                return None  # Removed while the poll was in flight
+            self.snapshots[camera.camera_id] = snapshot
+        metrics.CAMERA_HEALTH.set({HEALTHY: 1, DEGRADED: 0.5}.get(snapshot.health, 0), camera=camera.camera_id)
+        self.publish(snapshot)
+        self.reschedule(camera, schedule, delay)
+        return snapshot
@@ -0,0 +1,85 @@
+# registry.py
+
+import itertools
+import threading
+
+CAMERA_ADDED = "added"
+CAMERA_REMOVED = "removed"
+
+class CameraRegistry:
+    """Cameras keyed by their stable camera_id, shared by the poller, logger and dashboard.
+
+    Each camera also gets a display number ("Camera 3") when it is added. Numbers are
+    never reused, so log lines and dashboard tiles keep referring to the same camera
+    after others are removed.
+    """
+
+    def __init__(self, cameras=()):
+        self.cameras = {}  # camera_id -> Camera, in the order they were added
+        self.numbers = {}  # camera_id -> display number
+        self.counter = itertools.count(1)
+        self.subscribers = []
+        self.lock = threading.RLock()
+        for camera in cameras:
+            self.add(camera)
+
+    def subscribe(self, callback):
+        """Register a callback called as callback(event, camera) when a camera is added or removed."""
+        with self.lock:
+            self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """Stop sending add/remove events to a callback."""
+        with self.lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def add(self, camera):
+        """Add a camera, raising ValueError if its camera_id is already registered."""
+        with self.lock:
+            if camera.camera_id in self.cameras:
+                raise ValueError(f"Camera {camera.camera_id} is already registered")
+            self.cameras[camera.camera_id] = camera
+            self.numbers[camera.camera_id] = next(self.counter)
+            subscribers = list(self.subscribers)
+        self.notify(subscribers, CAMERA_ADDED, camera)
+        return camera
+
+    def remove(self, camera_id):
+        """Remove a camera by id and return it, or None if it wasn't registered."""
+        with self.lock:
+            camera = self.cameras.pop(camera_id, None)
+            if camera is None:
+                return None
+            subscribers = list(self.subscribers)
+        self.notify(subscribers, CAMERA_REMOVED, camera)
+        with self.lock:
+            self.numbers.pop(camera_id, None)
+        return camera
+
+    def notify(self, subscribers, event, camera):
+        """Send an add/remove event to every subscriber."""
+        for callback in subscribers:
+            try:
+                callback(event, camera)
+            except Exception as err:
+                print(f"Camera registry subscriber error: {err}")
+
+    def get(self, camera_id):
+        """Return the camera with this id, or None."""
+        return self.cameras.get(camera_id)
+
+    def number(self, camera_id):
+        """Return the display number of a camera, or None if it isn't registered."""
+        return self.numbers.get(camera_id)
+
+    def __contains__(self, camera_id):
+        return camera_id in self.cameras
+
+    def __len__(self):
+        return len(self.cameras)
+
+    def __iter__(self):
+        """Iterate over a copy of the cameras, so callers can add or remove while iterating."""
+        with self.lock:
+            return iter(list(self.cameras.values()))
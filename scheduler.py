@@ -0,0 +1,54 @@
+# scheduler.py
+
+import random
+
+# Configuration
+FAST_FACTOR = 0.5  # Poll twice as often while a camera's counts are changing
+IDLE_FACTOR = 3  # Poll three times less often once a camera has gone quiet
+IDLE_AFTER = 5  # Unchanged readings before a camera counts as idle
+MIN_INTERVAL = 0.5  # Never poll a camera more often than this (seconds)
+MAX_BACKOFF = 60  # Longest wait between retries for a failing camera (seconds)
+DEGRADED_AFTER = 1  # Consecutive failures before a camera is degraded
+OFFLINE_AFTER = 3  # Consecutive failures before a camera is offline
+MAX_BACKOFF_DOUBLINGS = 16  # Cap on the backoff exponent so long outages can't overflow a float
+
+HEALTHY = "healthy"
+DEGRADED = "degraded"
+OFFLINE = "offline"
+
+class PollSchedule:
+    """Decides when a camera should next be polled, based on its recent readings."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.failures = 0
+        self.unchanged = 0
+        self.last_counts = None
+
+    @property
+    def health(self):
+        """Return healthy, degraded or offline from the run of consecutive failures."""
+        if self.failures >= OFFLINE_AFTER:
+            return OFFLINE
+        if self.failures >= DEGRADED_AFTER:
+            return DEGRADED
+        return HEALTHY
+
+    def record_success(self, counts):
+        """Record a good reading and return the delay until the next poll."""
+        self.failures = 0
+        if self.last_counts is not None and counts != self.last_counts:
+            self.unchanged = 0
+            delay = self.interval * FAST_FACTOR
+        else:
+            self.unchanged += 1
+            delay = self.interval * IDLE_FACTOR if self.unchanged >= IDLE_AFTER else self.interval
+        self.last_counts = counts
+        return max(MIN_INTERVAL, delay)
+
+    def record_failure(self):
+        """Record a failed poll and return an exponentially backed-off delay with jitter."""
+        self.failures += 1
+        backoff = min(MAX_BACKOFF, self.interval * 2 ** min(self.failures, MAX_BACKOFF_DOUBLINGS))
+        # Equal jitter: keep half the backoff and randomise the rest so failing cameras don't retry in lockstep
+        return max(MIN_INTERVAL, backoff / 2 + random.uniform(0, backoff / 2))
@@ -1,4 +1,4 @@
-from setuptools import setup, find_packages
+from setuptools import setup
 
 setup(
     name="CameraCountingDashboard",
@@ -6,15 +6,19 @@ setup(
     description="A dashboard with people counting information including a logger and database",
     author="Kyle Kelly",
     author_email="Kyle.kelly@student.unsw.edu.au",
-    packages=find_packages(),
+    py_modules=["main", "camera", "collector", "dashboard", "database", "logger", "poller", "registry", "scheduler", "eventlog", "api", "metrics", "shard", "zones", "export", "statecache", "timeseries", "simulator", "bench"],
     include_package_data=True,  # Ensures non-Python files like config/data files are included
     install_requires=[
         'requests',  # Add other non-standard dependencies here
     ],
+    extras_require={
+        'api': ['Flask'],  # Optional HTTP occupancy API (--api-port)
+    },
     entry_points={
         'console_scripts': [
             'dashboard = main:main',  # Entry point for running `dashboard` from the command line
+            'dashboard-export = export:main',  # Export history from the database
         ],
     },
-    python_requires='>=3.6',  # Adjust this if you support different versions
+    python_requires='>=3.7',  # Adjust this if you support different versions
 )
\ No newline at end of file
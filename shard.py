@@ -0,0 +1,203 @@
+# shard.py
+
+import multiprocessing
+import signal
+import threading
+import time
+import metrics
+from camera import cameras_from_config, config_from_camera
+from poller import POLL_INTERVAL, POLL_WORKERS, CameraSnapshot, PollingEngine, SnapshotPublisher
+from registry import CameraRegistry
+from scheduler import DEGRADED, HEALTHY, OFFLINE
+
+SCAN_INTERVAL = 0.25  # Seconds between scans of the shared counts for new readings (and stop checks in the shards)
+RESTART_DELAY = 5  # Minimum seconds between restarts of a crashed shard process
+STOP_TIMEOUT = 5  # Seconds to wait for shard processes to exit before killing them
+
+# Layout of one camera's slot in the shared array. SEQ is odd while the shard is writing
+# the slot, and moves on by two for every reading, so readers can spot torn and new values.
+SEQ, ENTERED, EXITED, CURRENTLY_IN, HEALTH, ERROR, TIMESTAMP_MS = range(7)
+SLOT_FIELDS = 7
+
+HEALTH_CODES = {HEALTHY: 0, DEGRADED: 1, OFFLINE: 2}
+HEALTH_NAMES = {code: name for name, code in HEALTH_CODES.items()}
+
+# Metrics recorded inside the shard processes, sent to the parent so /metrics covers every camera.
+# Gauges such as polls_in_flight describe one process and are not forwarded.
+FORWARDED_METRICS = (
+    metrics.CAMERA_REQUEST_SECONDS, metrics.CAMERA_ERRORS, metrics.CAMERA_PARSE_SECONDS,
+    metrics.POLL_SECONDS, metrics.POLL_LAG_SECONDS,
+)
+
+def write_slot(shared, slot, snapshot):
+    """Store a snapshot in a camera's slot. Only the camera's own shard writes to it."""
+    base = slot * SLOT_FIELDS
+    shared[base + SEQ] += 1
+    shared[base + ENTERED:base + SLOT_FIELDS] = [
+        snapshot.entered, snapshot.exited, snapshot.currently_in, HEALTH_CODES.get(snapshot.health, 0),
+        1 if snapshot.error else 0, int(snapshot.timestamp * 1000),
+    ]
+    shared[base + SEQ] += 1
+
+def send_metrics(conn):
+    """Send the forwarded metrics recorded since the last call to the parent, if there are any."""
+    drained = [metric.drain() for metric in FORWARDED_METRICS]
+    if any(drained):
+        conn.send(drained)
+
+def run_shard(shard, camera_configs, slots, shared, stop_flag, conn, interval, max_workers):
+    """Entry point of a shard process: poll its cameras and publish counts to shared memory."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The parent handles Ctrl+C and stops the shards
+    registry = CameraRegistry(cameras_from_config({"cameras": camera_configs}))
+    slot_of = {camera.camera_id: slot for camera, slot in zip(registry, slots)}
+    engine = PollingEngine(registry, interval, max_workers)
+    engine.subscribe(lambda snapshot: write_slot(shared, slot_of[snapshot.camera.camera_id], snapshot))
+    engine.start()
+    # Poll a plain flag rather than waiting on a shared Event: a shard killed while waiting
+    # on an Event would leave Event.set() in the parent blocked forever
+    while not stop_flag.value:
+        time.sleep(SCAN_INTERVAL)
+        send_metrics(conn)
+    engine.stop()
+    send_metrics(conn)
+    for camera in registry:
+        camera.close()
+
+class ShardedEngine(SnapshotPublisher):
+    """Polling engine that spreads cameras over several worker processes.
+
+    Each shard process runs its own PollingEngine and writes every reading into a shared
+    array of per-camera slots, so HTTP and XML work uses every core and nothing is pickled
+    per update. The parent scans the array and publishes CameraSnapshots to subscribers
+    just like PollingEngine, so the logger and API work unchanged.
+
+    The camera list is fixed when the engine is created; cameras added to the registry
+    later are not polled.
+    """
+
+    def __init__(self, registry, workers, interval=POLL_INTERVAL, max_workers=POLL_WORKERS):
+        super().__init__()
+        self.registry = registry  # Reference, don't modify
+        self.workers = max(1, workers)
+        self.interval = interval
+        self.max_workers = max_workers
+        self.cameras = list(registry)  # Slot index -> Camera
+        # Spawn rather than fork: the parent has threads holding locks (writers, API, the scan
+        # thread) and already-merged metrics that a forked shard would inherit and send back
+        self.context = multiprocessing.get_context("spawn")
+        self.shared = self.context.Array("q", len(self.cameras) * SLOT_FIELDS, lock=False)
+        self.seen = [0] * len(self.cameras)  # Last sequence number published per slot
+        self.stop_flag = self.context.RawValue("b", 0)  # Set to 1 to stop every shard
+        self.processes = [None] * self.workers
+        self.connections = [None] * self.workers  # Receiving end of each shard's metrics pipe
+        self.started_at = [0.0] * self.workers
+        self.running = False
+        self.thread = None
+
+        metrics.SHARD_WORKERS_ALIVE.set_function(
+            lambda: sum(1 for process in self.processes if process and process.is_alive()))
+
+    def total_occupancy(self):
+        """Sum current occupancy straight from shared memory."""
+        return sum(self.shared[CURRENTLY_IN::SLOT_FIELDS])
+
+    def start(self):
+        """Start the shard processes and the thread that publishes their readings."""
+        if self.running:
+            return
+        self.running = True
+        for shard in range(self.workers):
+            self.start_shard(shard)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def start_shard(self, shard):
+        """Start (or restart) the process polling one shard of the cameras."""
+        slots = list(range(shard, len(self.cameras), self.workers))
+        for slot in slots:
+            if self.shared[slot * SLOT_FIELDS + SEQ] % 2:
+                # Killed halfway through a write: roll back to the last complete reading's
+                # number so the torn values aren't published and scan() doesn't skip the slot
+                self.shared[slot * SLOT_FIELDS + SEQ] -= 1
+        configs = [config_from_camera(self.cameras[slot]) for slot in slots]
+        if self.connections[shard] is not None:
+            self.connections[shard].close()
+        receiver, sender = self.context.Pipe(duplex=False)
+        process = self.context.Process(
+            target=run_shard, name=f"shard-{shard}", daemon=True,
+            args=(shard, configs, slots, self.shared, self.stop_flag, sender, self.interval, self.max_workers))
+        process.start()
+        sender.close()  # Only the shard writes to it
+        self.processes[shard] = process
+        self.connections[shard] = receiver
+        self.started_at[shard] = time.monotonic()
+
+    def stop(self):
+        """Stop the shard processes, killing any that don't exit in time."""
+        self.running = False
+        self.stop_flag.value = 1
+        for process in self.processes:
+            if process is None:
+                continue
+            process.join(STOP_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+        if self.thread:
+            self.thread.join(STOP_TIMEOUT)
+        self.receive_metrics()
+        for conn in self.connections:
+            if conn is not None:
+                conn.close()
+
+    def run(self):
+        """Publish new readings from shared memory and restart shards that crash."""
+        self.publish_restored()
+        while self.running:
+            self.scan()
+            self.receive_metrics()
+            self.check_shards()
+            time.sleep(SCAN_INTERVAL)
+
+    def receive_metrics(self):
+        """Merge metrics sent by the shard processes into this process's metrics."""
+        for conn in self.connections:
+            try:
+                while conn is not None and conn.poll():
+                    for metric, values in zip(FORWARDED_METRICS, conn.recv()):
+                        metric.merge(values)
+            except (EOFError, OSError, ValueError):
+                pass  # The shard died (possibly mid-message); check_shards restarts it
+            except Exception as err:
+                print(f"Error receiving shard metrics: {err}")
+
+    def check_shards(self):
+        """Restart shard processes that died while the engine is running."""
+        for shard, process in enumerate(self.processes):
+            if process.is_alive() or not self.running:
+                continue
+            if time.monotonic() - self.started_at[shard] >= RESTART_DELAY:
+                print(f"Shard {shard} exited with code {process.exitcode}, restarting")
+                self.receive_metrics()
+                self.start_shard(shard)
+
+    def scan(self):
+        """Publish a snapshot for every slot whose sequence number moved since the last scan."""
+        data = self.shared[:]
+        for slot, camera in enumerate(self.cameras):
+            base = slot * SLOT_FIELDS
+            seq = data[base + SEQ]
+            if seq == self.seen[slot] or seq % 2:
+                continue  # Nothing new, or the shard is halfway through writing it
+            values = self.shared[base:base + SLOT_FIELDS]
+            if values[SEQ] != seq or self.shared[base + SEQ] != seq:
+                continue  # Being rewritten; picked up on the next scan
+            self.seen[slot] = seq
+            if camera.camera_id not in self.registry:
+                continue
+            health = HEALTH_NAMES.get(values[HEALTH], OFFLINE)
+            snapshot = CameraSnapshot(camera, values[ENTERED], values[EXITED], values[CURRENTLY_IN],
+                                      values[TIMESTAMP_MS] / 1000, "Camera did not respond" if values[ERROR] else None,
+                                      health)
+            self.snapshots[camera.camera_id] = snapshot
+            metrics.CAMERA_HEALTH.set({HEALTHY: 1, DEGRADED: 0.5}.get(health, 0), camera=camera.camera_id)
+            self.publish(snapshot)
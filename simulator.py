@@ -0,0 +1,183 @@
+# simulator.py
+
+import argparse
+import base64
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+TRAFFIC = 0.2  # Average people entering per second at each simulated camera
+DWELL = 60  # Average seconds a simulated person stays before leaving
+LATENCY = 0.0  # Average seconds each simulated camera takes to answer
+ERROR_RATE = 0.0  # Fraction of reads answered with HTTP 503
+USERNAME_FORMAT = "cam{:04d}"  # Simulated cameras are told apart by their basic-auth username
+LISTEN_BACKLOG = 1024  # Pending connections the kernel queues, so a whole fleet can connect at once
+
+COUNTS_XML = ('<app name="personcount"><instance name="default">'
+              '<parameter name="inCountTotal">{entered}</parameter>'
+              '<parameter name="outCountTotal">{exited}</parameter>'
+              '</instance></app>')
+
+class SimulatedCamera:
+    """Counts for one simulated camera. People arrive at random and leave after a while."""
+
+    def __init__(self, traffic=TRAFFIC, dwell=DWELL, seed=None):
+        self.traffic = traffic
+        self.dwell = dwell
+        self.random = random.Random(seed)
+        self.entered = 0
+        self.exited = 0
+        self.last_update = time.monotonic()
+        self.lock = threading.Lock()
+
+    def advance(self):
+        """Move the counts on by the traffic since the last read."""
+        now = time.monotonic()
+        elapsed, self.last_update = now - self.last_update, now
+        expected = self.traffic * elapsed
+        inside = self.entered - self.exited
+        leave_chance = min(1.0, elapsed / self.dwell)
+        self.exited += sum(1 for _ in range(inside) if self.random.random() < leave_chance)
+        self.entered += int(expected) + (1 if self.random.random() < expected % 1 else 0)
+
+    def read(self):
+        """Return the camera's XML counts document."""
+        with self.lock:
+            self.advance()
+            return COUNTS_XML.format(entered=self.entered, exited=self.exited)
+
+    def reset(self):
+        """Zero the counts, like the real camera's manualReset."""
+        with self.lock:
+            self.entered = self.exited = 0
+            self.last_update = time.monotonic()
+
+class FleetRequestHandler(BaseHTTPRequestHandler):
+    """Answers /iAPI/apps.cgi reads and resets for the camera named by the basic-auth username."""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real cameras
+    disable_nagle_algorithm = True  # Headers and body go out in separate writes; don't hold the body back
+
+    def camera(self):
+        """Return the SimulatedCamera for this request's credentials, or None."""
+        header = self.headers.get("Authorization", "")
+        if not header.startswith("Basic "):
+            return None
+        try:
+            username = base64.b64decode(header[6:]).decode().split(":", 1)[0]
+        except ValueError:
+            return None
+        return self.server.fleet.cameras.get(username)
+
+    def do_GET(self):
+        self.handle_api("read")
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.handle_api("Update")
+
+    def handle_api(self, action):
+        fleet = self.server.fleet
+        url = urlparse(self.path)
+        if url.path != "/iAPI/apps.cgi" or parse_qs(url.query).get("action") != [action]:
+            return self.reply(404, "Not found")
+        camera = self.camera()
+        if camera is None:
+            return self.reply(401, "Unauthorized")
+        if fleet.latency:
+            time.sleep(random.uniform(0, 2 * fleet.latency))
+        if fleet.error_rate and random.random() < fleet.error_rate:
+            return self.reply(503, "Simulated failure")
+        if action == "read":
+            return self.reply(200, camera.read(), "text/xml")
+        camera.reset()
+        return self.reply(200, "OK")
+
+    def reply(self, status, body, content_type="text/plain"):
+        data = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+class FleetServer(ThreadingHTTPServer):
+    """HTTP server with a listen backlog big enough for hundreds of cameras connecting together."""
+
+    request_queue_size = LISTEN_BACKLOG
+    daemon_threads = True
+
+class SimulatedFleet:
+    """Local stand-in for N people counting cameras, served from one HTTP port.
+
+    Every camera shares the address; each has its own username, so a config from
+    camera_configs() points the app at the whole fleet.
+    """
+
+    def __init__(self, count, host="127.0.0.1", port=0, traffic=TRAFFIC, latency=LATENCY, error_rate=ERROR_RATE,
+                 dwell=DWELL, seed=None):
+        self.cameras = {USERNAME_FORMAT.format(i): SimulatedCamera(traffic, dwell, None if seed is None else seed + i)
+                        for i in range(1, count + 1)}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.server = FleetServer((host, port), FleetRequestHandler)
+        self.server.fleet = self
+        self.thread = None
+
+    @property
+    def address(self):
+        """Return "host:port", used as the IP of every simulated camera."""
+        host, port = self.server.server_address[:2]
+        return f"{host}:{port}"
+
+    def camera_configs(self):
+        """Return config entries for every simulated camera (the "cameras" section of a config)."""
+        return [{"ip": self.address, "username": username, "password": "simulated", "id": username}
+                for username in self.cameras]
+
+    def start(self):
+        """Serve the fleet in a background thread."""
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop serving."""
+        self.server.shutdown()
+        self.server.server_close()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate a fleet of people counting cameras")
+    parser.add_argument("--cameras", type=int, default=10, help="Number of cameras (default 10)")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8081, help="Port to listen on (default 8081)")
+    parser.add_argument("--traffic", type=float, default=TRAFFIC, help="People per second at each camera")
+    parser.add_argument("--dwell", type=float, default=DWELL, help="Average seconds people stay inside")
+    parser.add_argument("--latency", type=float, default=LATENCY, help="Average response time in seconds")
+    parser.add_argument("--error-rate", type=float, default=ERROR_RATE, help="Fraction of reads that fail with 503")
+    parser.add_argument("--config", help="Write a camera config for the fleet to this file")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    fleet = SimulatedFleet(args.cameras, args.host, args.port, args.traffic, args.latency, args.error_rate, args.dwell)
+    if args.config:
+        with open(args.config, "w") as f:
+            json.dump({"cameras": fleet.camera_configs()}, f, indent=4)
+        print(f"Wrote config for {args.cameras} cameras to {args.config}")
+    fleet.start()
+    print(f"Simulating {args.cameras} cameras on http://{fleet.address}/iAPI/apps.cgi. Press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        fleet.stop()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
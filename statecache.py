@@ -0,0 +1,105 @@
+# statecache.py
+
+import json
+import os
+import threading
+from poller import CameraSnapshot
+from registry import CAMERA_REMOVED
+
+STATE_FILE = 'camera_state.json'
+SAVE_INTERVAL = 10  # Seconds between saves while counts are changing
+
+# 'error' of snapshots restored from the state file, so the logger never treats them as readings
+CACHED = "Cached from the previous run"
+
+class StateCache:
+    """Last known counts and health of every camera, saved to disk for a warm start.
+
+    On startup the saved counts are turned into snapshots so the dashboard and API have
+    numbers to show before the first poll answers.
+    """
+
+    def __init__(self, registry, engine, path=STATE_FILE, save_interval=SAVE_INTERVAL):
+        self.registry = registry  # Reference, don't modify
+        self.engine = engine
+        self.path = path
+        self.save_interval = save_interval
+        self.states = self.load()  # camera_id -> {'entered', 'exited', 'currently_in', 'health', 'timestamp'}
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+        self.engine.subscribe(self.update)
+        self.registry.subscribe(self.on_registry_event)
+
+    def load(self):
+        """Read the state file, returning an empty dict if it is missing or unreadable."""
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f).get('cameras', {})
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as err:
+            print(f"Ignoring unreadable state file {self.path}: {err}")
+            return {}
+
+    def snapshots(self):
+        """Return a CACHED snapshot for every registered camera with a saved state."""
+        snapshots = []
+        for camera in self.registry:
+            state = self.states.get(camera.camera_id)
+            if state:
+                snapshots.append(CameraSnapshot(camera, state['entered'], state['exited'], state['currently_in'],
+                                                state['timestamp'], CACHED, state['health']))
+        return snapshots
+
+    def update(self, snapshot):
+        """Remember a camera's latest counts and health."""
+        with self.lock:
+            self.states[snapshot.camera.camera_id] = {
+                'entered': snapshot.entered,
+                'exited': snapshot.exited,
+                'currently_in': snapshot.currently_in,
+                'health': snapshot.health,
+                'timestamp': snapshot.timestamp,
+            }
+            self.dirty = True
+
+    def on_registry_event(self, event, camera):
+        """Forget removed cameras."""
+        if event == CAMERA_REMOVED:
+            with self.lock:
+                self.states.pop(camera.camera_id, None)
+                self.dirty = True
+
+    def save(self):
+        """Write the states to disk if they changed, replacing the file atomically."""
+        with self.lock:
+            if not self.dirty:
+                return
+            document = {'cameras': dict(self.states)}
+            self.dirty = False
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(document, f)
+            os.replace(temp_path, self.path)
+        except OSError as err:
+            print(f"Failed to save camera state to {self.path}: {err}")
+
+    def start(self):
+        """Save the states every save_interval seconds until closed."""
+        def run():
+            while not self.stopped.wait(self.save_interval):
+                self.save()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        """Stop following the engine and save one last time."""
+        self.engine.unsubscribe(self.update)
+        self.registry.unsubscribe(self.on_registry_event)
+        self.stopped.set()
+        self.save()
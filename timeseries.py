@@ -0,0 +1,146 @@
+# timeseries.py
+
+import threading
+import time
+from array import array
+from registry import CAMERA_REMOVED
+
+# (bucket width in seconds, number of buckets) for each resolution kept per series:
+# 1 s buckets for the last 10 minutes and 1 min buckets for the last 24 hours
+TIERS = ((1, 600), (60, 1440))
+TOTAL = "total"  # Series id of the all-camera total
+
+class Ring:
+    """Fixed-size ring of integer buckets, each holding the peak value recorded in it.
+
+    Buckets that nothing was recorded in repeat the value before them, since occupancy
+    doesn't change between polls.
+    """
+
+    def __init__(self, width, size):
+        self.width = width
+        self.size = size
+        self.values = array('i', [0]) * size
+        self.first_slot = None  # Slot (time // width) of the oldest value ever recorded
+        self.last_slot = None  # Slot of the newest value recorded
+
+    def record(self, when, value):
+        """Record a value at an epoch time."""
+        slot = int(when // self.width)
+        if self.last_slot is None:
+            self.first_slot = self.last_slot = slot
+            self.values[slot % self.size] = value
+        elif slot > self.last_slot:
+            # Carry the last value through skipped buckets (at most one lap of the ring)
+            last_value = self.values[self.last_slot % self.size]
+            for skipped in range(max(self.last_slot + 1, slot - self.size + 1), slot):
+                self.values[skipped % self.size] = last_value
+            self.values[slot % self.size] = value
+            self.last_slot = slot
+        elif slot >= max(self.first_slot, self.last_slot - self.size + 1):
+            index = slot % self.size  # A late value for a bucket still in the ring
+            self.values[index] = max(self.values[index], value)
+
+    def window(self, now, count):
+        """Return the last 'count' bucket values up to 'now', oldest first; None before the first value."""
+        end = int(now // self.width)
+        count = min(count, self.size)
+        oldest_kept = self.last_slot - self.size + 1 if self.last_slot is not None else None
+        values = []
+        for slot in range(end - count + 1, end + 1):
+            if self.last_slot is None or slot < max(self.first_slot, oldest_kept):
+                values.append(None)
+            elif slot > self.last_slot:
+                values.append(self.values[self.last_slot % self.size])
+            else:
+                values.append(self.values[slot % self.size])
+        return values
+
+class Series:
+    """One value over time, kept at every resolution in TIERS."""
+
+    def __init__(self, tiers=TIERS):
+        self.rings = [Ring(width, size) for width, size in tiers]
+        self.version = 0  # Bumped on every record, so views can skip redraws
+
+    def record(self, when, value):
+        for ring in self.rings:
+            ring.record(when, value)
+        self.version += 1
+
+    def window(self, seconds, points, now=None):
+        """Return 'points' values covering the last 'seconds', using the finest resolution that reaches back that far.
+
+        Buckets are merged by taking their peak, so short spikes still show.
+        """
+        now = time.time() if now is None else now
+        ring = next((ring for ring in self.rings if ring.width * ring.size >= seconds), self.rings[-1])
+        buckets = ring.window(now, max(1, int(seconds // ring.width)))
+        per_point = max(1, len(buckets) // points)
+        values = []
+        for start in range(len(buckets) % per_point, len(buckets), per_point):
+            chunk = [value for value in buckets[start:start + per_point] if value is not None]
+            values.append(max(chunk) if chunk else None)
+        return values
+
+class TrendStore:
+    """In-memory occupancy history per camera and for the total, fed by the polling engine.
+
+    Memory is fixed per camera (a few kilobytes) however long the app runs, and reading
+    trends never touches the database.
+    """
+
+    def __init__(self, registry, engine, tiers=TIERS):
+        self.registry = registry  # Reference, don't modify
+        self.engine = engine
+        self.tiers = tiers
+        self.series = {TOTAL: Series(tiers)}  # camera_id or TOTAL -> Series
+        self.latest = {}  # camera_id -> last occupancy counted in the total
+        self.total = 0
+        self.lock = threading.Lock()
+
+        self.engine.subscribe(self.update)
+        self.registry.subscribe(self.on_registry_event)
+
+    def update(self, snapshot):
+        """Record a camera's occupancy and the new total."""
+        if snapshot.error:
+            return  # Failed polls and cached counts repeat old values; the gap is carried forward instead
+        camera_id = snapshot.camera.camera_id
+        with self.lock:
+            series = self.series.get(camera_id)
+            if series is None:
+                if camera_id not in self.registry:
+                    return
+                series = self.series[camera_id] = Series(self.tiers)
+            series.record(snapshot.timestamp, snapshot.currently_in)
+            self.total += snapshot.currently_in - self.latest.get(camera_id, 0)
+            self.latest[camera_id] = snapshot.currently_in
+            self.series[TOTAL].record(snapshot.timestamp, self.total)
+
+    def on_registry_event(self, event, camera):
+        """Drop a removed camera's history and take it out of the total."""
+        if event != CAMERA_REMOVED:
+            return
+        with self.lock:
+            self.series.pop(camera.camera_id, None)
+            self.total -= self.latest.pop(camera.camera_id, 0)
+            self.series[TOTAL].record(time.time(), self.total)
+
+    def version(self, series_id):
+        """Return how many values a series has recorded, or None if it doesn't exist."""
+        series = self.series.get(series_id)
+        return series.version if series else None
+
+    def window(self, series_id, seconds, points, now=None):
+        """Return (version, values) for a series over the last 'seconds', or (None, []) if it has no history."""
+        with self.lock:
+            series = self.series.get(series_id)
+            if series is None:
+                return None, []
+            return series.version, series.window(seconds, points, now)
+
+    def close(self):
+        """Stop following the polling engine and registry."""
+        self.engine.unsubscribe(self.update)
+        self.registry.unsubscribe(self.on_registry_event)
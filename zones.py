@@ -0,0 +1,174 @@
+# zones.py
+
+import threading
+from collections import namedtuple
+from registry import CAMERA_REMOVED
+
+# Current state of a zone, published whenever its occupancy changes.
+# 'limit' is None for zones without a limit.
+ZoneState = namedtuple("ZoneState", ["zone_id", "name", "occupancy", "limit", "over_limit"])
+
+class Zone:
+    """A named area (site, floor, room) built from the "zones" section of a config."""
+
+    def __init__(self, zone_id, name=None, parent=None, limit=None, cameras=(), reverse_cameras=()):
+        self.zone_id = zone_id
+        self.name = name or zone_id
+        self.parent = parent  # zone_id of the enclosing zone, or None
+        self.limit = limit or None
+        self.cameras = list(cameras)  # Entries at these cameras come into the zone
+        self.reverse_cameras = list(reverse_cameras)  # Exits at these cameras come into the zone
+        self.occupancy = 0
+
+    def state(self):
+        """Return the zone's current ZoneState."""
+        over_limit = self.limit is not None and self.occupancy > self.limit
+        return ZoneState(self.zone_id, self.name, self.occupancy, self.limit, over_limit)
+
+    def config(self):
+        """Return the config entry for this zone."""
+        entry = {"id": self.zone_id, "name": self.name}
+        if self.parent:
+            entry["parent"] = self.parent
+        if self.limit:
+            entry["limit"] = self.limit
+        if self.cameras:
+            entry["cameras"] = self.cameras
+        if self.reverse_cameras:
+            entry["reverse_cameras"] = self.reverse_cameras
+        return entry
+
+def zones_from_config(zone_configs):
+    """Build Zones from the "zones" section of a config, raising ValueError if it is inconsistent."""
+    zones = {}
+    for entry in zone_configs or ():
+        zone = Zone(entry['id'], entry.get('name'), entry.get('parent'), entry.get('limit'),
+                    entry.get('cameras', ()), entry.get('reverse_cameras', ()))
+        if zone.zone_id in zones:
+            raise ValueError(f"Zone {zone.zone_id} is defined more than once")
+        zones[zone.zone_id] = zone
+
+    for zone in zones.values():
+        seen = {zone.zone_id}
+        parent = zone.parent
+        while parent is not None:
+            if parent not in zones:
+                raise ValueError(f"Zone {zone.zone_id} has unknown parent zone {parent}")
+            if parent in seen:
+                raise ValueError(f"Zone {zone.zone_id} is inside itself")
+            seen.add(parent)
+            parent = zones[parent].parent
+    return list(zones.values())
+
+class ZoneTracker:
+    """Zone occupancy kept up to date from camera snapshots.
+
+    A camera's occupancy counts towards every zone that lists it (negated for
+    reverse_cameras, so a door between two rooms moves people from one to the other)
+    and towards every zone enclosing those zones. The weights are worked out once,
+    so each snapshot only touches the zones its camera affects.
+    """
+
+    def __init__(self, registry, engine, zones):
+        self.registry = registry  # Reference, don't modify
+        self.engine = engine
+        self.zones = {zone.zone_id: zone for zone in zones}  # In config order
+        self.weights = {}  # camera_id -> [(Zone, +1 or -1)]
+        self.counted = {}  # camera_id -> occupancy already added to its zones
+        self.subscribers = []
+        self.lock = threading.RLock()
+
+        self.build_weights()
+        for camera_id in self.weights:
+            if camera_id not in self.registry:
+                print(f"Zone config refers to unknown camera {camera_id}")
+
+        if self.zones:
+            self.engine.subscribe(self.update)
+            self.registry.subscribe(self.on_registry_event)
+
+    def build_weights(self):
+        """Work out how much one person at each camera moves each zone, ancestors included."""
+        weights = {}
+        for zone in self.zones.values():
+            for camera_ids, sign in ((zone.cameras, 1), (zone.reverse_cameras, -1)):
+                for camera_id in camera_ids:
+                    camera_weights = weights.setdefault(camera_id, {})
+                    target = zone
+                    while target is not None:
+                        camera_weights[target.zone_id] = camera_weights.get(target.zone_id, 0) + sign
+                        target = self.zones.get(target.parent)
+        # A door between two rooms of the same floor cancels out for the floor; drop those
+        self.weights = {
+            camera_id: [(self.zones[zone_id], weight) for zone_id, weight in camera_weights.items() if weight]
+            for camera_id, camera_weights in weights.items()
+        }
+
+    def subscribe(self, callback):
+        """Register a callback that receives a ZoneState whenever a zone's occupancy changes.
+
+        Callbacks are called with the tracker locked, so states arrive in order; keep them quick.
+        """
+        with self.lock:
+            self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """Stop sending zone changes to a callback."""
+        with self.lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def update(self, snapshot):
+        """Apply the change in a camera's occupancy to the zones it feeds."""
+        camera_id = snapshot.camera.camera_id
+        if camera_id not in self.weights:
+            return  # Failed polls are applied too: they repeat the last counts, so nothing moves
+        self.apply(camera_id, snapshot.currently_in)
+
+    def on_registry_event(self, event, camera):
+        """Take a removed camera's people out of its zones."""
+        if event == CAMERA_REMOVED and camera.camera_id in self.weights:
+            self.apply(camera.camera_id, 0)
+
+    def apply(self, camera_id, occupancy):
+        """Move a camera's contribution to 'occupancy' and publish the zones that changed."""
+        with self.lock:
+            delta = occupancy - self.counted.get(camera_id, 0)
+            if not delta:
+                return
+            self.counted[camera_id] = occupancy
+            changed = []
+            for zone, weight in self.weights[camera_id]:
+                zone.occupancy += weight * delta
+                changed.append(zone.state())
+            self.publish(changed)
+
+    def publish(self, states):
+        """Send zone states to every subscriber. Caller holds the lock."""
+        for state in states:
+            for callback in self.subscribers:
+                try:
+                    callback(state)
+                except Exception as err:
+                    print(f"Zone subscriber error: {err}")
+
+    def states(self):
+        """Return the current ZoneState of every zone, in config order."""
+        with self.lock:
+            return [zone.state() for zone in self.zones.values()]
+
+    def set_limit(self, zone_id, limit):
+        """Change a zone's limit (None for no limit) and publish its new state."""
+        with self.lock:
+            zone = self.zones[zone_id]
+            zone.limit = limit or None
+            self.publish([zone.state()])
+
+    def config(self):
+        """Return the "zones" section of a config for the current zones."""
+        return [zone.config() for zone in self.zones.values()]
+
+    def close(self):
+        """Stop following the polling engine and registry."""
+        self.engine.unsubscribe(self.update)
+        self.registry.unsubscribe(self.on_registry_event)